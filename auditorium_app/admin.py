@@ -49,14 +49,14 @@ class RoomAdmin(admin.ModelAdmin):
     list_display = ['room_number', 'building', 'floor', 'purpose', 'room_type', 'get_area_display']
     list_filter = ['building', 'floor', 'purpose', 'room_type', 'department']
     search_fields = ['room_number', 'building__name', 'description']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['area', 'volume', 'capacity_estimate', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Основная информация', {
             'fields': ('building', 'room_number', 'floor', 'location_in_building')
         }),
         ('Размеры', {
-            'fields': ('width', 'length', 'ceiling_height')
+            'fields': ('width', 'length', 'ceiling_height', 'area', 'volume', 'capacity_estimate')
         }),
         ('Назначение', {
             'fields': ('purpose', 'room_type', 'department')
@@ -73,6 +73,7 @@ class RoomAdmin(admin.ModelAdmin):
     def get_area_display(self, obj):
         return f"{obj.get_area():.1f} кв.м"
     get_area_display.short_description = 'Площадь'
+    get_area_display.admin_order_field = 'area'
 
 
 @admin.register(BuildingFloor)
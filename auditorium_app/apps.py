@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AuditoriumAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'auditorium_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,175 @@
+"""
+Асинхронные (ASGI) версии JSON API.
+
+Запросы к БД выполняются через async ORM, поэтому под ASGI-сервером ожидающие
+клиенты не занимают рабочий поток. Разбор параметров и формирование ответа
+общие с синхронными представлениями из views.py. Маршруты api/ переключаются
+на эти представления настройкой ASYNC_API (см. urls.py), кроме служебных
+api/db/connections/ и api/statistics/cache/: они читают только счетчики
+процесса, без обращений к БД, и остаются синхронными.
+"""
+import datetime
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Building, Room
+from .rollups import department_subtree_totals
+from .search import SEARCHES, autocomplete
+from .views import (
+    ApiError, BUILDING_API_FIELDS, DEPARTMENT_API_FIELDS, ROOM_API_FIELDS, ROOMS_ORDERING,
+    _api_departments_queryset, _api_ids, _api_list_data, _api_list_paginator,
+    _api_rooms_queryset, _autocomplete_params, _buildings_statistics_data,
+    _buildings_statistics_rows, _department_statistics_data, _fold_buildings_statistics,
+    _room_calculations, _rooms_calculations_data, _rooms_calculations_queryset, _search_params,
+    _search_result, building_statistics, building_validators, request_validators,
+    room_validators,
+)
+
+
+def _aconditional(get_validators):
+    """
+    Условный GET для async-представления (аналог views._conditional).
+
+    Декоратор condition() в Django 4.2 не поддерживает async-функции, поэтому
+    логика повторена здесь; валидаторы вычисляются одним запросом в потоке ORM
+    и, как в views.request_validators(), запоминаются в запросе.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, **kwargs):
+            etag, last_modified = await sync_to_async(request_validators)(
+                request, get_validators, **kwargs
+            )
+            etag = quote_etag(etag) if etag is not None else None
+            if last_modified:
+                if not timezone.is_aware(last_modified):
+                    last_modified = timezone.make_aware(last_modified, datetime.timezone.utc)
+                last_modified = int(last_modified.timestamp())
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, **kwargs)
+
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return inner
+    return decorator
+
+
+async def _api_response(build):
+    try:
+        return JsonResponse(await build())
+    except ApiError as exc:
+        return JsonResponse({'error': str(exc), **exc.details}, status=exc.status)
+
+
+async def _api_list(request, queryset, api_fields, ordering):
+    paginator, fields = _api_list_paginator(request, queryset, api_fields, ordering)
+    data = _api_list_data(await paginator.aget_page(request.GET.get('cursor')), fields)
+    if request.GET.get('count'):
+        data['count'] = await sync_to_async(lambda: paginator.count)()
+    return data
+
+
+@_aconditional(room_validators)
+async def api_room_calculations(request, room_id):
+    """API для получения расчетов помещения"""
+    row = await Room.objects.filter(id=room_id).values(
+        'id', 'area', 'volume', 'capacity_estimate'
+    ).afirst()
+    if row is None:
+        raise Http404("Помещение не найдено")
+
+    data = _room_calculations(row)
+    del data['id']
+    return JsonResponse(data)
+
+
+async def api_rooms_calculations(request):
+    """API: расчеты для набора помещений (?ids=1,2,3 или ?building=&floor=) одним запросом"""
+    async def build():
+        rooms, ids = _rooms_calculations_queryset(request)
+        return _rooms_calculations_data([row async for row in rooms], ids)
+    return await _api_response(build)
+
+
+@_aconditional(building_validators)
+async def api_building_statistics(request, building_id):
+    """API для получения статистики корпуса"""
+    # Валидаторы уже вычислены декоратором; кеш статистики синхронный: чтение и
+    # пересчет при промахе - в потоке ORM
+    etag, _ = await sync_to_async(request_validators)(
+        request, building_validators, building_id=building_id
+    )
+    statistics = await sync_to_async(building_statistics)(building_id, etag)
+    if statistics is None:
+        raise Http404("Корпус не найден")
+
+    return JsonResponse(statistics)
+
+
+async def api_department_statistics(request, department_id):
+    """API: статистика подразделения с учетом подчиненных и по дочерним подразделениям"""
+    # Рекурсивный запрос выполняется курсором БД - в потоке ORM
+    statistics = await sync_to_async(department_subtree_totals)(department_id)
+    return JsonResponse(_department_statistics_data(statistics))
+
+
+async def api_buildings_statistics(request):
+    """API: статистика нескольких корпусов (?ids=1,2,3, по умолчанию - все) одним запросом"""
+    async def build():
+        building_ids = _api_ids(request)
+        rows = [row async for row in _buildings_statistics_rows(building_ids)]
+        return _buildings_statistics_data(_fold_buildings_statistics(rows), building_ids)
+    return await _api_response(build)
+
+
+async def api_rooms(request):
+    """API: список помещений с фильтрами и выбором полей"""
+    return await _api_response(
+        lambda: _api_list(request, _api_rooms_queryset(request), ROOM_API_FIELDS, ROOMS_ORDERING)
+    )
+
+
+async def api_buildings(request):
+    """API: список корпусов с выбором полей"""
+    return await _api_response(
+        lambda: _api_list(request, Building.objects.all(), BUILDING_API_FIELDS, ('name', 'id'))
+    )
+
+
+async def api_search(request):
+    """API: полнотекстовый поиск (?q=, ?type=rooms,buildings,departments, ?limit=)"""
+    async def build():
+        query, limit, kinds = _search_params(request)
+        data = {'query': query}
+        for kind in kinds:
+            data[kind] = [_search_result(kind, obj) async for obj in SEARCHES[kind](query, limit)]
+        return data
+    return await _api_response(build)
+
+
+async def api_autocomplete(request):
+    """API: автодополнение номеров помещений и названий (?q=, ?type=, ?limit=)"""
+    async def build():
+        query, limit, kinds = _autocomplete_params(request)
+        # Кеш подсказок синхронный - в потоке ORM вместе с запросом
+        results = await sync_to_async(autocomplete)(query, limit, kinds)
+        return {'query': query, 'results': results}
+    return await _api_response(build)
+
+
+async def api_departments(request):
+    """API: список подразделений с фильтрами по родителю и типу"""
+    return await _api_response(lambda: _api_list(
+        request, _api_departments_queryset(request), DEPARTMENT_API_FIELDS, ('name', 'id')
+    ))
@@ -0,0 +1,154 @@
+"""
+Пул соединений с PostgreSQL на уровне процесса.
+
+Бэкенд auditorium_app.db_pool (см. base.py) вместо закрытия возвращает
+соединение в пул, и следующий запрос получает уже открытое соединение.
+Пул общий для всех потоков процесса, поэтому работает и под ASGI, где
+постоянные соединения Django (CONN_MAX_AGE) привязаны к потокам.
+"""
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Все соединения пула заняты дольше timeout"""
+
+
+class ConnectionPool:
+    """
+    Пул не более size соединений.
+
+    connect() открывает новое соединение (можно передать и в acquire()),
+    check(conn) проверяет свободное соединение перед выдачей, reset(conn)
+    готовит возвращаемое соединение к повторному использованию (False или
+    исключение - соединение закрывается).
+    Свободные дольше max_idle секунд соединения закрываются при выдаче.
+    """
+
+    def __init__(self, connect=None, size=10, timeout=10.0, max_idle=300.0, check=None, reset=None):
+        self._connect = connect
+        self._check = check
+        self._reset = reset
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = deque()
+        self._in_use = 0
+        self._condition = threading.Condition()
+        self._counters = dict.fromkeys(
+            ('created', 'checkouts', 'waits', 'timeouts', 'discarded'), 0
+        )
+
+    def _discard(self, conn):
+        self._counters['discarded'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _usable(self, conn, released_at):
+        if self.max_idle is not None and time.monotonic() - released_at > self.max_idle:
+            return False
+        try:
+            return self._check is None or self._check(conn)
+        except Exception:
+            return False
+
+    def acquire(self, connect=None):
+        """Выдать свободное соединение, открыть новое или дождаться освобождения"""
+        connect = connect or self._connect
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn = None
+            with self._condition:
+                while True:
+                    if self._idle:
+                        conn, released_at = self._idle.pop()
+                        break
+                    if self._in_use < self.size:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeout(
+                            f"Нет свободных соединений в пуле ({self.size}) за {self.timeout} с"
+                        )
+                    self._counters['waits'] += 1
+                    self._condition.wait(remaining)
+                self._in_use += 1
+
+            # Проверка и открытие соединения - вне блокировки: место в пуле уже занято
+            try:
+                if conn is None:
+                    conn = connect()
+                    self._count('created')
+                elif not self._usable(conn, released_at):
+                    with self._condition:
+                        self._discard(conn)
+                    conn = None
+            except BaseException:
+                self._give_back(None)
+                raise
+            if conn is not None:
+                self._count('checkouts')
+                return conn
+            self._give_back(None)
+
+    def _count(self, counter):
+        with self._condition:
+            self._counters[counter] += 1
+
+    def _give_back(self, conn):
+        with self._condition:
+            self._in_use -= 1
+            if conn is not None:
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def release(self, conn):
+        """Вернуть соединение в пул"""
+        try:
+            reusable = self._reset is None or self._reset(conn)
+        except Exception:
+            reusable = False
+        if not reusable:
+            with self._condition:
+                self._discard(conn)
+            conn = None
+        self._give_back(conn)
+
+    def close(self):
+        """Закрыть все свободные соединения"""
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self.size,
+                'timeout': self.timeout,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                **self._counters,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, factory):
+    """Пул для псевдонима БД (создается при первом обращении)"""
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = factory()
+        return _pools[alias]
+
+
+def pool_stats():
+    """Статистика всех пулов процесса: {псевдоним БД: статистика}"""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
@@ -0,0 +1,66 @@
+"""
+PostgreSQL с пулом соединений.
+
+Настраивается через OPTIONS['pool'] (как во встроенном пуле Django 5.1):
+{'size': 10, 'timeout': 10, 'max_idle': 300}. Соединение берется из пула при
+connect() и возвращается в него при close(), поэтому CONN_MAX_AGE должен быть 0.
+Свободное соединение перед выдачей проверяется запросом SELECT 1, если
+включен CONN_HEALTH_CHECKS.
+"""
+from django.db.backends.postgresql import base
+
+from . import ConnectionPool, PoolTimeout, get_pool
+
+# TransactionStatus.IDLE в psycopg2 и psycopg 3
+TRANSACTION_STATUS_IDLE = 0
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def _pool_options(self):
+        options = self.settings_dict['OPTIONS'].get('pool') or {}
+        return {
+            'size': int(options.get('size', 10)),
+            'timeout': float(options.get('timeout', 10)),
+            'max_idle': float(options.get('max_idle', 300)),
+        }
+
+    def _check_pooled(self, conn):
+        if conn.closed:
+            return False
+        if self.settings_dict['CONN_HEALTH_CHECKS']:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        return True
+
+    @staticmethod
+    def _reset_pooled(conn):
+        if conn.closed:
+            return False
+        if conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+        return True
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, lambda: ConnectionPool(
+            check=self._check_pooled,
+            reset=self._reset_pooled,
+            **self._pool_options(),
+        ))
+
+    def get_new_connection(self, conn_params):
+        try:
+            return self.pool.acquire(
+                lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+            )
+        except PoolTimeout as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+
+    def _close(self):
+        if self.connection is not None:
+            self.pool.release(self.connection)
@@ -0,0 +1,108 @@
+"""
+Счетчики фильтров (фасеты) списка помещений.
+
+Для каждого значения корпуса, назначения и вида помещения считается, сколько
+помещений останется, если выбрать это значение при остальных текущих фильтрах;
+для этажей - сколько помещений текущей выборки на каждом этаже. Все счетчики -
+один запрос: GROUPING SETS с COUNT(*) FILTER в PostgreSQL, UNION ALL
+сгруппированных запросов в остальных СУБД. Результат кешируется на
+ROOMS_FACETS_CACHE_TIMEOUT секунд для каждого сочетания фильтров.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import CharField, Count, Value
+from django.db.models.functions import Cast
+
+from .models import Room
+
+# Фасет (параметр фильтра) и столбец помещения; этаж - только счетчики
+FACETS = (
+    ('building', 'building_id'),
+    ('purpose', 'purpose'),
+    ('room_type', 'room_type'),
+    ('floor', 'floor'),
+)
+
+
+def _conditions(filters, skip=None):
+    """[(столбец, значение)] активных фильтров, кроме фасета skip"""
+    return [
+        (column, filters[facet]) for facet, column in FACETS
+        if facet in filters and facet != skip
+    ]
+
+
+def _sql_condition(conditions):
+    quote = connection.ops.quote_name
+    sql = ' AND '.join(f'{quote(column)} = %s' for column, _ in conditions) or 'TRUE'
+    return sql, [value for _, value in conditions]
+
+
+def _grouping_sets_rows(filters):
+    """PostgreSQL: все фасеты одним проходом по таблице"""
+    quote = connection.ops.quote_name
+    columns = [quote(column) for _, column in FACETS]
+    facet_when, value_when, count_when, count_params = [], [], [], []
+    for (facet, _), column in zip(FACETS, columns):
+        condition, params = _sql_condition(_conditions(filters, skip=facet))
+        facet_when.append(f"WHEN GROUPING({column}) = 0 THEN '{facet}'")
+        value_when.append(f"WHEN GROUPING({column}) = 0 THEN {column}::text")
+        count_when.append(f"WHEN GROUPING({column}) = 0 THEN COUNT(*) FILTER (WHERE {condition})")
+        count_params.extend(params)
+
+    # Строка нужна хотя бы одному фасету, если не подходит не более чем по одному фильтру
+    where, where_params = [], []
+    active = _conditions(filters)
+    if len(active) > 1:
+        for facet, _ in FACETS:
+            if facet in filters:
+                condition, params = _sql_condition(_conditions(filters, skip=facet))
+                where.append(f'({condition})')
+                where_params.extend(params)
+
+    sql = (
+        f"SELECT CASE {' '.join(facet_when)} END, CASE {' '.join(value_when)} END, "
+        f"CASE {' '.join(count_when)} END "
+        f"FROM {quote(Room._meta.db_table)} "
+        f"{'WHERE ' + ' OR '.join(where) if where else ''} "
+        f"GROUP BY GROUPING SETS ({', '.join(f'({column})' for column in columns)})"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, count_params + where_params)
+        return cursor.fetchall()
+
+
+def _union_rows(filters):
+    """Остальные СУБД: по сгруппированному запросу на фасет, объединенные UNION ALL"""
+    querysets = [
+        Room.objects.filter(**dict(_conditions(filters, skip=facet))).order_by().annotate(
+            facet=Value(facet), value=Cast(column, CharField()),
+        ).values('facet', 'value').annotate(count=Count('id')).values_list('facet', 'value', 'count')
+        for facet, column in FACETS
+    ]
+    first, *rest = querysets
+    return list(first.union(*rest, all=True))
+
+
+def room_facets(filters):
+    """
+    {фасет: {значение (строка): число помещений}} для фильтров {параметр: значение}
+    из _filter_rooms().
+    """
+    key = 'rooms_facets:' + hashlib.md5(urlencode(sorted(filters.items())).encode()).hexdigest()
+    facets = cache.get(key)
+    if facets is None:
+        if connection.vendor == 'postgresql':
+            rows = _grouping_sets_rows(filters)
+        else:
+            rows = _union_rows(filters)
+        facets = {facet: {} for facet, _ in FACETS}
+        for facet, value, count in rows:
+            if count:
+                facets[facet][value] = count
+        cache.set(key, facets, getattr(settings, 'ROOMS_FACETS_CACHE_TIMEOUT', 30))
+    return facets
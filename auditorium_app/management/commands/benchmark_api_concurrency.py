@@ -0,0 +1,146 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+DEFAULT_PATHS = ['/api/buildings/statistics/', '/api/rooms/?limit=20']
+
+
+def percentile(values, fraction):
+    """Перцентиль по отсортированному списку (ближайший ранг)"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+async def fetch(host, port, path):
+    """Один GET-запрос по отдельному соединению; возвращает HTTP-статус"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode('latin-1')
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+    finally:
+        writer.close()
+    parts = status_line.split()
+    return int(parts[1]) if len(parts) > 1 else 0
+
+
+async def hold_slow_client(host, port, path, stop):
+    """Медленный клиент: держит соединение, досылая заголовки раз в секунду"""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n".encode('latin-1'))
+        while not stop.is_set():
+            await writer.drain()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                writer.write(b"X-Slow-Client: 1\r\n")
+    except OSError:
+        pass
+    finally:
+        writer.close()
+
+
+async def run_level(base_url, paths, concurrency, total, slow_clients, timeout):
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    prefix = url.path.rstrip('/')
+    stop = asyncio.Event()
+    slow = [
+        asyncio.create_task(hold_slow_client(host, port, prefix + paths[0], stop))
+        for _ in range(slow_clients)
+    ]
+    if slow:
+        await asyncio.sleep(0.5)
+
+    latencies, errors = [], 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for number in counter:
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(
+                    fetch(host, port, prefix + paths[number % len(paths)]), timeout
+                )
+            except (OSError, asyncio.TimeoutError):
+                status = 0
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await asyncio.gather(*slow)
+
+    latencies.sort()
+    return {
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+        'errors': errors,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочное сравнение JSON API под WSGI и ASGI: множество одновременных "
+        "коротких запросов (и, при необходимости, медленных клиентов) к двум "
+        "запущенным экземплярам приложения (см. docker-compose.yml)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', default='http://localhost:8000',
+                            help="Адрес экземпляра под WSGI (по умолчанию http://localhost:8000)")
+        parser.add_argument('--asgi-url', default='http://localhost:8001',
+                            help="Адрес экземпляра под ASGI (по умолчанию http://localhost:8001)")
+        parser.add_argument('--path', action='append', dest='paths',
+                            help="Путь запроса, можно указать несколько раз")
+        parser.add_argument('--concurrency', default='10,100,500',
+                            help="Уровни одновременных запросов через запятую")
+        parser.add_argument('--requests', type=int, default=1000,
+                            help="Количество запросов на каждый уровень")
+        parser.add_argument('--slow-clients', type=int, default=0,
+                            help="Количество медленных клиентов, удерживающих соединения")
+        parser.add_argument('--timeout', type=float, default=30.0,
+                            help="Тайм-аут одного запроса, с")
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(value) for value in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError("--concurrency должен быть списком целых чисел через запятую")
+        if not levels or min(levels) < 1 or options['requests'] < 1:
+            raise CommandError("Уровни и количество запросов должны быть положительными")
+        paths = options['paths'] or DEFAULT_PATHS
+
+        self.stdout.write(
+            f"{'Сервер':<6} {'Параллельно':>11} {'Запр/с':>9} {'p50, мс':>9} "
+            f"{'p95, мс':>9} {'p99, мс':>9} {'Ошибок':>7}"
+        )
+        for label, base_url in (('WSGI', options['wsgi_url']), ('ASGI', options['asgi_url'])):
+            for concurrency in levels:
+                result = asyncio.run(run_level(
+                    base_url, paths, concurrency, options['requests'],
+                    options['slow_clients'], options['timeout'],
+                ))
+                self.stdout.write(
+                    f"{label:<6} {concurrency:>11} {result['rps']:>9.1f} {result['p50']:>9.1f} "
+                    f"{result['p95']:>9.1f} {result['p99']:>9.1f} {result['errors']:>7}"
+                )
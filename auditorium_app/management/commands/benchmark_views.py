@@ -0,0 +1,215 @@
+import time
+import tracemalloc
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import URLPattern, reverse
+
+from auditorium_app import urls
+from auditorium_app.models import Building, Department, Room
+
+
+# Бюджеты представлений: число SQL-запросов, p95 задержки (мс) и пик памяти (КБ)
+# на наборе данных по умолчанию. Число запросов не должно зависеть от объема
+# данных, поэтому лишний запрос на строку сразу выходит за бюджет. Запросы
+# считаются при пустом кеше (статистика, счетчики фильтров, автодополнение),
+# то есть по пути вычисления, а не по ответу из кеша.
+VIEW_BUDGETS = {
+    'index': {'queries': 4, 'p95_ms': 250, 'memory_kb': 4096},
+    'buildings_list': {'queries': 2, 'p95_ms': 150, 'memory_kb': 2048},
+    'building_detail': {'queries': 6, 'p95_ms': 250, 'memory_kb': 4096},
+    'building_faculties': {'queries': 2, 'p95_ms': 150, 'memory_kb': 2048},
+    'building_create': {'queries': 0, 'p95_ms': 100, 'memory_kb': 1024},
+    'building_edit': {'queries': 3, 'p95_ms': 100, 'memory_kb': 1024},
+    'building_delete': {'queries': 1, 'p95_ms': 100, 'memory_kb': 1024},
+    'rooms_list': {'queries': 4, 'p95_ms': 250, 'memory_kb': 4096},
+    'rooms_list?filtered': {'queries': 4, 'p95_ms': 250, 'memory_kb': 4096},
+    'rooms_list?cursor': {'queries': 4, 'p95_ms': 250, 'memory_kb': 4096},
+    'rooms_export': {'queries': 1, 'p95_ms': 1500, 'memory_kb': 8192},
+    'room_detail': {'queries': 3, 'p95_ms': 150, 'memory_kb': 2048},
+    'room_create': {'queries': 2, 'p95_ms': 150, 'memory_kb': 2048},
+    'room_edit': {'queries': 3, 'p95_ms': 150, 'memory_kb': 2048},
+    'room_delete': {'queries': 2, 'p95_ms': 100, 'memory_kb': 1024},
+    'departments_list': {'queries': 1, 'p95_ms': 250, 'memory_kb': 4096},
+    'department_detail': {'queries': 5, 'p95_ms': 250, 'memory_kb': 4096},
+    'api_rooms': {'queries': 1, 'p95_ms': 100, 'memory_kb': 2048},
+    'api_rooms?limit': {'queries': 1, 'p95_ms': 250, 'memory_kb': 8192},
+    'api_buildings': {'queries': 1, 'p95_ms': 100, 'memory_kb': 1024},
+    'api_departments': {'queries': 1, 'p95_ms': 100, 'memory_kb': 1024},
+    'api_rooms_calculations': {'queries': 1, 'p95_ms': 100, 'memory_kb': 2048},
+    'api_room_calculations': {'queries': 2, 'p95_ms': 50, 'memory_kb': 512},
+    'api_buildings_statistics': {'queries': 1, 'p95_ms': 150, 'memory_kb': 1024},
+    'api_building_statistics': {'queries': 2, 'p95_ms': 100, 'memory_kb': 512},
+    'api_db_connections': {'queries': 0, 'p95_ms': 50, 'memory_kb': 256},
+    'api_department_statistics': {'queries': 1, 'p95_ms': 100, 'memory_kb': 512},
+    'api_statistics_cache': {'queries': 0, 'p95_ms': 50, 'memory_kb': 256},
+    'search': {'queries': 3, 'p95_ms': 250, 'memory_kb': 4096},
+    'api_search': {'queries': 3, 'p95_ms': 150, 'memory_kb': 2048},
+    'api_autocomplete': {'queries': 1, 'p95_ms': 50, 'memory_kb': 512},
+}
+
+# Дополнительные варианты запросов: {метка: (имя маршрута, строка запроса)}
+EXTRA_REQUESTS = {
+    'rooms_list?filtered': ('rooms_list', 'building={building_id}&purpose=lecture&room_type=auditorium'),
+    'rooms_list?cursor': ('rooms_list', 'cursor='),
+    'api_rooms?limit': ('api_rooms', 'limit=500'),
+    'api_rooms_calculations': ('api_rooms_calculations', 'building={building_id}&floor=1'),
+    'search': ('search', 'q=Корпус 1'),
+    'api_search': ('api_search', 'q=лаборатория'),
+    'api_autocomplete': ('api_autocomplete', 'q=10'),
+}
+
+
+def percentile(values, fraction):
+    """Перцентиль по отсортированному списку (ближайший ранг)"""
+    index = min(len(values) - 1, max(0, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер всех маршрутов auditorium_app внутри процесса на тестовой БД с "
+        "сгенерированными данными: p50/p95 задержки, число SQL-запросов и пик памяти. "
+        "Выход за бюджет представления (VIEW_BUDGETS) завершает команду с ошибкой."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=0.1,
+                            help="Масштаб данных generate_dataset (по умолчанию 0.1)")
+        parser.add_argument('--rooms-per-building', type=int, default=200,
+                            help="Помещений в корпусе (по умолчанию 200)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--iterations', type=int, default=20,
+                            help="Замеров на каждый маршрут (по умолчанию 20)")
+        parser.add_argument('--only', action='append', default=[],
+                            help="Замерить только указанные маршруты (можно несколько раз)")
+        parser.add_argument('--use-existing-db', action='store_true',
+                            help="Использовать текущую БД вместо отдельной тестовой; "
+                                 "данные генерируются, только если она пуста")
+        parser.add_argument('--skip-latency-budgets', action='store_true',
+                            help="Проверять только число запросов и память "
+                                 "(для нестабильных по скорости окружений)")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations должен быть положительным")
+        if options['use_existing_db']:
+            return self.run(options)
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            return self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    # Служебные API замеряются без входа в админку
+    @override_settings(DIAGNOSTICS_API=True)
+    def run(self, options):
+        if not Building.objects.exists():
+            self.stdout.write("Генерация данных...")
+            call_command(
+                'generate_dataset', scale=options['scale'], seed=options['seed'],
+                rooms_per_building=options['rooms_per_building'], stdout=self.stdout,
+            )
+
+        requests = self.collect_requests()
+        if options['only']:
+            requests = {label: url for label, url in requests.items() if label in options['only']}
+        missing = sorted(set(requests) - set(VIEW_BUDGETS))
+        if missing:
+            raise CommandError(f"Нет бюджета для маршрутов: {', '.join(missing)}")
+
+        client = Client()
+        self.stdout.write(
+            f"{'Маршрут':<28} {'p50, мс':>9} {'p95, мс':>9} {'Запросов':>9} {'С кешем':>8} "
+            f"{'Память, КБ':>11}"
+        )
+        violations = []
+        for label, url in requests.items():
+            result = self.measure(client, url, options['iterations'])
+            self.stdout.write(
+                f"{label:<28} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+                f"{result['queries']:>9} {result['warm_queries']:>8} {result['memory_kb']:>11.0f}"
+            )
+            if result['status'] != 200:
+                violations.append(f"{label}: ответ {result['status']}")
+            budget = VIEW_BUDGETS[label]
+            for metric, value in result.items():
+                if metric not in budget or (metric == 'p95_ms' and options['skip_latency_budgets']):
+                    continue
+                if value > budget[metric]:
+                    violations.append(f"{label}: {metric} = {value:.1f}, бюджет {budget[metric]}")
+
+        if violations:
+            raise CommandError("Превышены бюджеты:\n" + "\n".join(violations))
+        self.stdout.write(self.style.SUCCESS("Все маршруты в пределах бюджетов"))
+
+    def collect_requests(self):
+        """URL каждого маршрута auditorium_app (параметры - реальные объекты из БД)"""
+        building = Building.objects.order_by('pk').first()
+        department = (
+            Department.objects.filter(depth=1).order_by('pk').first()
+            or Department.objects.order_by('pk').first()
+        )
+        kwargs = {
+            'building_id': building.pk,
+            'room_id': Room.objects.filter(building=building).order_by('pk').values_list('pk', flat=True)[0],
+            'department_id': department.pk,
+        }
+        requests = {}
+        for pattern in urls.urlpatterns:
+            if not isinstance(pattern, URLPattern):
+                continue
+            names = pattern.pattern.converters
+            requests[pattern.name] = reverse(
+                f'{urls.app_name}:{pattern.name}', kwargs={name: kwargs[name] for name in names}
+            )
+        for label, (name, query) in EXTRA_REQUESTS.items():
+            requests[label] = f'{requests[name]}?{query.format(**kwargs)}'
+        return requests
+
+    def measure(self, client, url, iterations):
+        def get():
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response
+
+        get()  # прогрев: шаблоны, кеши ORM
+        # Запросы без кеша (бюджет) и с заполненным им же кешем (для сведения)
+        for backend in caches.all():
+            backend.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = get()
+        query_count = len(queries)
+        with CaptureQueriesContext(connection) as queries:
+            get()
+        warm_query_count = len(queries)
+
+        tracemalloc.start()
+        try:
+            get()
+            memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        latencies = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            get()
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        return {
+            'status': response.status_code,
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'queries': query_count,
+            'warm_queries': warm_query_count,
+            'memory_kb': memory / 1024,
+        }
@@ -0,0 +1,243 @@
+import csv
+import io
+import random
+import time
+from decimal import Decimal
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from auditorium_app import rollups, stats_cache
+from auditorium_app.models import (
+    Building, BuildingFloor, BuildingRollup, Department, DepartmentRollup, FloorRollup, Room,
+)
+
+
+# Масштаб 1: 100 корпусов по 1000 помещений и 20 подразделений на уровень
+BUILDINGS_PER_SCALE = 100
+DEPARTMENTS_PER_LEVEL_PER_SCALE = 20
+
+DEPARTMENT_TYPES = ['university', 'faculty', 'institute', 'department']
+DEEP_DEPARTMENT_TYPES = ['laboratory', 'center']
+
+# Назначение помещения и подходящий вид помещения
+PURPOSE_ROOM_TYPES = {
+    'lecture': 'auditorium',
+    'seminar': 'auditorium',
+    'computer': 'auditorium',
+    'conference': 'auditorium',
+    'laboratory': 'laboratory',
+    'office': 'office',
+    'library': 'office',
+    'storage': 'storage',
+    'utility': 'utility',
+    'recreation': 'recreation',
+}
+
+ROOM_COLUMNS = [
+    'building_id', 'room_number', 'floor', 'location_in_building', 'width', 'length',
+    'ceiling_height', 'purpose', 'room_type', 'department_id', 'description',
+    'area', 'volume', 'capacity_estimate', 'created_at', 'updated_at',
+]
+
+WINGS = ['Крыло А', 'Крыло Б', 'Крыло В', 'Центральная часть']
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def room_number(floor, sequence):
+    """
+    Номер помещения "этаж-порядковый номер": разделитель исключает совпадения
+    вида 1 + 1001 и 11 + 001 при тысяче и более помещений на этаже
+    """
+    return f"{floor}-{sequence:03d}"
+
+
+def _decimal(rng, low, high):
+    return Decimal(f'{rng.uniform(low, high):.2f}')
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерация синтетических данных для нагрузочного тестирования. Масштаб 1 - "
+        "100 корпусов, 100 тыс. помещений и дерево подразделений из 10 уровней; "
+        "масштаб 10 - 1000 корпусов и 1 млн помещений. Одинаковые --scale и --seed "
+        "дают одинаковые данные."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help="Масштаб (по умолчанию 1)")
+        parser.add_argument('--seed', type=int, default=42, help="Начальное значение ГПСЧ")
+        parser.add_argument('--rooms-per-building', type=int, default=1000,
+                            help="Помещений в корпусе (по умолчанию 1000)")
+        parser.add_argument('--department-levels', type=int, default=10,
+                            help="Уровней в дереве подразделений (по умолчанию 10)")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Размер пакета вставки (по умолчанию 5000)")
+        parser.add_argument('--no-copy', action='store_true',
+                            help="Не использовать COPY в PostgreSQL (только bulk_create)")
+        parser.add_argument('--clear', action='store_true',
+                            help="Предварительно удалить все корпуса, помещения и подразделения")
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        if scale <= 0 or options['rooms_per_building'] < 1 or options['department_levels'] < 1:
+            raise CommandError("Масштаб, число помещений и уровней должны быть положительными")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size должен быть положительным")
+        if not options['clear'] and (Building.objects.exists() or Department.objects.exists()):
+            raise CommandError("База данных не пуста: используйте --clear")
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            if options['clear']:
+                self.clear()
+            departments = self.create_departments(
+                options['department_levels'],
+                max(1, round(DEPARTMENTS_PER_LEVEL_PER_SCALE * scale)),
+            )
+            floors = self.create_buildings(max(1, round(BUILDINGS_PER_SCALE * scale)))
+            rooms = self.create_rooms(floors, departments, options['rooms_per_building'])
+            # Помещения загружены в обход сигналов - итоги пересчитываются целиком
+            rollups.rebuild()
+        stats_cache.invalidate_all()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано: корпусов {len(floors)}, этажей {sum(len(f) for f in floors.values())}, "
+            f"подразделений {len(departments) + 1}, помещений {rooms} "
+            f"за {time.perf_counter() - started:.1f} с"
+        ))
+
+    def clear(self):
+        """
+        Очистить таблицы так же, как команда flush: TRUNCATE ... RESTART IDENTITY
+        CASCADE в PostgreSQL, DELETE со сбросом счетчиков id в SQLite. Без сигналов
+        и каскадов delete() - итоги и кеш статистики после загрузки пересчитываются;
+        счетчики id сбрасываются, чтобы одинаковый --seed давал те же первичные ключи.
+        """
+        tables = [
+            model._meta.db_table
+            for model in (BuildingRollup, FloorRollup, DepartmentRollup,
+                          Room, BuildingFloor, Building, Department)
+        ]
+        connection.ops.execute_sql_flush(connection.ops.sql_flush(
+            no_style(), tables, reset_sequences=True, allow_cascade=True,
+        ))
+
+    def create_departments(self, levels, per_level):
+        """Дерево подразделений по уровням; возвращает id всех, кроме корня"""
+        rng = self.rng
+        root = Department.objects.bulk_create([
+            Department(name="Университет", department_type='university'),
+        ])[0]
+        parents, created = [root.pk], []
+        for level in range(1, levels):
+            if level < len(DEPARTMENT_TYPES):
+                department_type = DEPARTMENT_TYPES[level]
+            else:
+                department_type = DEEP_DEPARTMENT_TYPES[level % len(DEEP_DEPARTMENT_TYPES)]
+            level_departments = Department.objects.bulk_create([
+                Department(
+                    name=f"Подразделение {level}.{number}",
+                    parent_id=parents[0] if level == 1 else rng.choice(parents),
+                    department_type=department_type,
+                )
+                for number in range(1, per_level + 1)
+            ], batch_size=self.batch_size)
+            parents = [department.pk for department in level_departments]
+            created.extend(parents)
+        Department.rebuild_paths()
+        return created
+
+    def create_buildings(self, count):
+        """Корпуса и строки BuildingFloor для каждого этажа; {id корпуса: [высоты этажей]}"""
+        rng = self.rng
+        buildings = Building.objects.bulk_create([
+            Building(
+                name=f"Корпус {number}",
+                address=f"г. Москва, ул. Университетская, д. {number}",
+                floors_count=rng.randint(3, 12),
+            )
+            for number in range(1, count + 1)
+        ], batch_size=self.batch_size)
+
+        floors = {}
+        for building in buildings:
+            floors[building.pk] = [_decimal(rng, 2.7, 4.5) for _ in range(building.floors_count)]
+        for batch in _batches((
+            BuildingFloor(building_id=building_id, floor_number=number, ceiling_height=height)
+            for building_id, heights in floors.items()
+            for number, height in enumerate(heights, start=1)
+        ), self.batch_size):
+            BuildingFloor.objects.bulk_create(batch)
+        return floors
+
+    def generate_rooms(self, floors, departments, rooms_per_building):
+        rng = self.rng
+        purposes = list(PURPOSE_ROOM_TYPES)
+        now = timezone.now()
+        for building_id, heights in floors.items():
+            for index in range(rooms_per_building):
+                floor = index % len(heights) + 1
+                purpose = rng.choice(purposes)
+                room = Room(
+                    building_id=building_id,
+                    room_number=room_number(floor, index // len(heights) + 1),
+                    floor=floor,
+                    location_in_building=rng.choice(WINGS),
+                    width=_decimal(rng, 3, 20),
+                    length=_decimal(rng, 3, 25),
+                    ceiling_height=heights[floor - 1],
+                    purpose=purpose,
+                    room_type=PURPOSE_ROOM_TYPES[purpose],
+                    department_id=rng.choice(departments) if rng.random() < 0.8 else None,
+                    created_at=now,
+                    updated_at=now,
+                )
+                room.update_dimensions()
+                yield room
+
+    def create_rooms(self, floors, departments, rooms_per_building):
+        total = 0
+        for batch in _batches(
+            self.generate_rooms(floors, departments, rooms_per_building), self.batch_size
+        ):
+            if self.use_copy:
+                self.copy_rooms(batch)
+            else:
+                Room.objects.bulk_create(batch)
+            total += len(batch)
+            if total % (self.batch_size * 20) == 0:
+                self.stdout.write(f"Помещений: {total}")
+        return total
+
+    def copy_rooms(self, rooms):
+        """Вставка пакета помещений через COPY (PostgreSQL)"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for room in rooms:
+            writer.writerow([
+                r'\N' if value is None else value
+                for value in (getattr(room, column) for column in ROOM_COLUMNS)
+            ])
+        buffer.seek(0)
+        table = connection.ops.quote_name(Room._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {table} ({', '.join(ROOM_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
@@ -0,0 +1,364 @@
+import csv
+import json
+import sys
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from auditorium_app import rollups, stats_cache
+from auditorium_app.forms import BuildingForm
+from auditorium_app.models import Building, Department, Room
+
+
+BUILDING_FIELDS = ['name', 'address', 'floors_count', 'description']
+DEPARTMENT_FIELDS = ['name', 'department_type', 'parent', 'description']
+ROOM_FIELDS = [
+    'building', 'room_number', 'floor', 'location_in_building', 'width', 'length',
+    'ceiling_height', 'purpose', 'room_type', 'department', 'description',
+]
+ROOM_UPDATE_FIELDS = [
+    'floor', 'location_in_building', 'width', 'length', 'ceiling_height', 'purpose',
+    'room_type', 'department', 'description', 'area', 'volume', 'capacity_estimate',
+    'updated_at',
+]
+
+
+def read_records(stream, file_format):
+    """Итератор (номер записи, словарь полей) для CSV или NDJSON"""
+    if file_format == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, row
+        return
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield number, exc
+            continue
+        yield number, record if isinstance(record, dict) else ValueError("ожидался JSON-объект")
+
+
+def _clean_value(value):
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def _error_text(exc):
+    if isinstance(exc, ValidationError):
+        if hasattr(exc, 'error_dict'):
+            return '; '.join(
+                f"{field}: {' '.join(messages)}" for field, messages in exc.message_dict.items()
+            )
+        return ' '.join(exc.messages)
+    return str(exc)
+
+
+class NaturalKeyResolver:
+    """Поиск id объектов по наименованию с кешированием между пакетами"""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = {}
+        self.ambiguous = set()
+
+    def load(self, names):
+        missing = {name for name in names if name and name not in self.ids}
+        missing -= self.ambiguous
+        if not missing:
+            return
+        for name, obj_id in self.model.objects.filter(name__in=missing).values_list('name', 'id'):
+            if name in self.ids:
+                self.ambiguous.add(name)
+            self.ids[name] = obj_id
+
+    def add(self, name, obj_id):
+        self.ids[name] = obj_id
+
+    def resolve(self, name, label):
+        if name in self.ambiguous:
+            raise ValidationError(f"{label} '{name}' неоднозначно: найдено несколько записей")
+        if name not in self.ids:
+            raise ValidationError(f"{label} '{name}' не найдено")
+        return self.ids[name]
+
+
+class Command(BaseCommand):
+    help = (
+        "Массовая загрузка корпусов, подразделений или помещений из CSV/NDJSON. "
+        "Корпуса и подразделения сопоставляются по наименованию, помещения - по корпусу "
+        "и номеру; существующие записи обновляются. Ошибочные строки выводятся и "
+        "пропускаются, остальные строки пакета загружаются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['buildings', 'departments', 'rooms'])
+        parser.add_argument('path', help="Путь к файлу или '-' для stdin")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], dest='file_format',
+                            help="Формат файла (по умолчанию - по расширению)")
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Размер пакета проверки и загрузки (по умолчанию 2000)")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['file_format']
+        if file_format is None:
+            file_format = 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size должен быть положительным")
+
+        self.batch_size = options['batch_size']
+        self.loaded = 0
+        self.failed = 0
+        self.processed = 0
+
+        loader = getattr(self, f"load_{options['kind']}")
+        try:
+            stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        except OSError as exc:
+            raise CommandError(f"Не удалось открыть файл: {exc}")
+        with stream:
+            records = read_records(stream, file_format)
+            while True:
+                batch = list(islice(records, self.batch_size))
+                if not batch:
+                    break
+                valid = []
+                for number, record in batch:
+                    if isinstance(record, Exception):
+                        self.report_error(number, record)
+                    else:
+                        valid.append((number, {k: _clean_value(v) for k, v in record.items()}))
+                loader(valid)
+                self.processed += len(batch)
+                self.stdout.write(
+                    f"Обработано записей: {self.processed}, загружено: {self.loaded}, "
+                    f"ошибок: {self.failed}"
+                )
+
+        if options['kind'] == 'departments':
+            Department.rebuild_paths()
+        # Пакетная загрузка идет в обход сигналов
+        if options['kind'] == 'rooms':
+            rollups.rebuild()
+        stats_cache.invalidate_all()
+        self.stdout.write(self.style.SUCCESS(
+            f"Импорт завершен: загружено {self.loaded}, ошибок {self.failed}"
+        ))
+
+    def report_error(self, number, exc):
+        self.failed += 1
+        self.stderr.write(f"Запись {number}: {_error_text(exc)}")
+
+    def _save_batch(self, items, save):
+        """
+        Сохранить пакет items [(номер записи, объект, ...)] вызовом save(items) в
+        отдельной транзакции. При сбое БД записи пакета сохраняются по одной, каждая
+        в своей точке сохранения, и ошибочными помечаются только сбойные записи.
+        Возвращает сохраненные записи.
+        """
+        try:
+            with transaction.atomic():
+                save(items)
+        except DatabaseError:
+            saved = []
+            for item in items:
+                try:
+                    with transaction.atomic():
+                        save([item])
+                except DatabaseError as exc:
+                    self.report_error(item[0], exc)
+                else:
+                    saved.append(item)
+        else:
+            saved = list(items)
+        self.loaded += len(saved)
+        return saved
+
+    def _validate(self, number, instance, exclude):
+        """Проверка полей и бизнес-правил модели без обращений к БД"""
+        try:
+            instance.clean_fields(exclude=exclude)
+            instance.clean()
+        except ValidationError as exc:
+            self.report_error(number, exc)
+            return False
+        return True
+
+    def load_buildings(self, records):
+        resolver = NaturalKeyResolver(Building)
+        resolver.load(record.get('name') for _, record in records)
+        to_create, to_update = {}, {}
+        for number, record in records:
+            form = BuildingForm(data={field: record.get(field, '') for field in BUILDING_FIELDS})
+            if not form.is_valid():
+                self.report_error(number, ValidationError(form.errors.as_data()))
+                continue
+            building = form.instance
+            target = to_create
+            if building.name in resolver.ids:
+                try:
+                    building.pk = resolver.resolve(building.name, "Корпус")
+                except ValidationError as exc:
+                    self.report_error(number, exc)
+                    continue
+                target = to_update
+            if building.name in target:
+                self.report_error(target[building.name][0], ValidationError(
+                    f"Корпус '{building.name}' повторяется в файле, использована запись {number}"
+                ))
+            target[building.name] = (number, building)
+
+        def save(items):
+            new = [b for _, b in items if b.name not in resolver.ids]
+            for building in new:
+                building.pk = None  # мог быть присвоен в откаченной транзакции пакета
+            Building.objects.bulk_create(new)
+            existing = [b for _, b in items if b.name in resolver.ids]
+            # bulk_update не применяет auto_now, а по updated_at строятся
+            # валидаторы корпуса (ETag/Last-Modified)
+            now = timezone.now()
+            for building in existing:
+                building.updated_at = now
+            Building.objects.bulk_update(
+                existing, ['address', 'floors_count', 'description', 'updated_at']
+            )
+        self._save_batch([*to_create.values(), *to_update.values()], save)
+
+    def _creates_cycle(self, department_id, parent_id):
+        """Родитель parent_id - само подразделение или его подчиненное"""
+        while parent_id is not None:
+            if parent_id == department_id:
+                return True
+            parent_id = self.department_parents.get(parent_id)
+        return False
+
+    def load_departments(self, records):
+        if not hasattr(self, 'departments'):
+            self.departments = NaturalKeyResolver(Department)
+            # Текущие родители: проверка, что перенос не вкладывает подразделение в себя
+            self.department_parents = dict(Department.objects.values_list('id', 'parent_id'))
+        resolver = self.departments
+        resolver.load(
+            name for _, record in records for name in (record.get('name'), record.get('parent'))
+        )
+        pending, names = [], {}
+        for number, record in records:
+            department = Department(
+                name=record.get('name', ''),
+                department_type=record.get('department_type', ''),
+                description=record.get('description', ''),
+            )
+            if not self._validate(number, department, exclude=['parent']):
+                continue
+            if department.name in resolver.ids:
+                try:
+                    department.pk = resolver.resolve(department.name, "Подразделение")
+                except ValidationError as exc:
+                    self.report_error(number, exc)
+                    continue
+            if department.name in names:
+                # Последняя запись с тем же наименованием заменяет предыдущую
+                self.report_error(names[department.name], ValidationError(
+                    f"Подразделение '{department.name}' повторяется в файле, использована запись {number}"
+                ))
+                pending = [item for item in pending if item[1].name != department.name]
+            names[department.name] = number
+            pending.append((number, department, record.get('parent', '')))
+
+        # Загружаем по уровням: сначала строки, чей родитель уже известен
+        while pending:
+            ready, waiting = [], []
+            for item in pending:
+                parent = item[2]
+                (ready if not parent or parent in resolver.ids else waiting).append(item)
+            if not ready:
+                for number, _, parent in waiting:
+                    self.report_error(number, ValidationError(
+                        f"Родительское подразделение '{parent}' не найдено"
+                    ))
+                break
+            resolved = []
+            for number, department, parent in ready:
+                try:
+                    department.parent_id = resolver.resolve(parent, "Подразделение") if parent else None
+                    if department.pk is not None and self._creates_cycle(department.pk, department.parent_id):
+                        raise ValidationError("Подразделение не может быть вложено само в себя")
+                except ValidationError as exc:
+                    self.report_error(number, exc)
+                    continue
+                resolved.append((number, department, parent))
+
+            def save(items):
+                new = [d for _, d, _ in items if d.name not in resolver.ids]
+                existing = [d for _, d, _ in items if d.name in resolver.ids]
+                for department in new:
+                    department.pk = None  # мог быть присвоен в откаченной транзакции пакета
+                now = timezone.now()
+                for department in existing:
+                    department.updated_at = now
+                Department.objects.bulk_create(new)
+                Department.objects.bulk_update(
+                    existing, ['department_type', 'description', 'parent', 'updated_at']
+                )
+            for _, department, _ in self._save_batch(resolved, save):
+                resolver.add(department.name, department.pk)
+                self.department_parents[department.pk] = department.parent_id
+            pending = waiting
+
+    def load_rooms(self, records):
+        if not hasattr(self, 'buildings'):
+            self.buildings = NaturalKeyResolver(Building)
+            self.departments = NaturalKeyResolver(Department)
+            self.floors_count = {}
+        self.buildings.load(record.get('building') for _, record in records)
+        self.departments.load(record.get('department') for _, record in records)
+        missing_floors = set(self.buildings.ids.values()) - set(self.floors_count)
+        if missing_floors:
+            self.floors_count.update(
+                Building.objects.filter(pk__in=missing_floors).values_list('id', 'floors_count')
+            )
+
+        rooms = {}
+        for number, record in records:
+            room = Room(**{
+                field: record.get(field, '')
+                for field in ROOM_FIELDS if field not in ('building', 'department')
+            })
+            try:
+                room.building_id = self.buildings.resolve(record.get('building', ''), "Корпус")
+                if record.get('department'):
+                    room.department_id = self.departments.resolve(record['department'], "Подразделение")
+            except ValidationError as exc:
+                self.report_error(number, exc)
+                continue
+            if not self._validate(number, room, exclude=['building', 'department']):
+                continue
+            if room.floor > self.floors_count[room.building_id]:
+                self.report_error(number, ValidationError(
+                    f"Этаж не может быть больше количества этажей в корпусе "
+                    f"({self.floors_count[room.building_id]})"
+                ))
+                continue
+            room.update_dimensions()
+            key = (room.building_id, room.room_number)
+            if key in rooms:
+                self.report_error(rooms[key][0], ValidationError(
+                    f"Помещение '{room.room_number}' повторяется в файле, использована запись {number}"
+                ))
+            rooms[key] = (number, room)
+
+        def save(items):
+            Room.objects.bulk_create(
+                [room for _, room in items],
+                update_conflicts=True,
+                unique_fields=['building', 'room_number'],
+                update_fields=ROOM_UPDATE_FIELDS,
+            )
+        self._save_batch(list(rooms.values()), save)
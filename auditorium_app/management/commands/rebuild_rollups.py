@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from auditorium_app import rollups, stats_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчет таблиц итогов (корпуса, этажи, подразделения) с нуля по помещениям. "
+        "С --check только сравнивает итоги с пересчетом и сообщает о расхождениях."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help="Не изменять итоги; при расхождениях завершиться с ошибкой")
+        parser.add_argument('--limit', type=int, default=20,
+                            help="Сколько расхождений вывести (по умолчанию 20)")
+
+    def handle(self, *args, **options):
+        if options['check']:
+            differences = rollups.drift()
+        else:
+            differences = rollups.rebuild()
+            stats_cache.invalidate_all()
+
+        for model, key, expected, actual in differences[:options['limit']]:
+            self.stdout.write(
+                f"{model.__name__} {key}: ожидается {self.format_totals(expected)}, "
+                f"сохранено {self.format_totals(actual)}"
+            )
+        if len(differences) > options['limit']:
+            self.stdout.write(f"... и еще {len(differences) - options['limit']}")
+
+        if options['check']:
+            if differences:
+                raise CommandError(f"Расхождений в итогах: {len(differences)}")
+            self.stdout.write(self.style.SUCCESS("Итоги совпадают с пересчетом"))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Итоги пересчитаны, исправлено расхождений: {len(differences)}"
+            ))
+
+    @staticmethod
+    def format_totals(totals):
+        count, area, volume = totals
+        return f"помещений {count}, площадь {area}, объем {volume}"
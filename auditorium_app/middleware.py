@@ -0,0 +1,170 @@
+"""
+Профилирование запросов: число и время SQL-запросов, время отрисовки шаблонов
+и общее время обработки.
+
+Результат отдается заголовком Server-Timing и строкой лога (JSON) в логгер
+auditorium_app.profiling. Повторяющиеся запросы с одинаковым отпечатком SQL
+(признак N+1) выводятся предупреждением. Учет идет через contextvar, поэтому
+работает и для async-представлений, чьи запросы выполняются в других потоках.
+"""
+import contextvars
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template
+
+logger = logging.getLogger('auditorium_app.profiling')
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+_IN_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def fingerprint(sql):
+    """SQL без литералов и с одинаковыми списками IN - для поиска повторов"""
+    return _LITERAL.sub('?', _IN_LIST.sub('%s, ...', sql))
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.statements = Counter()
+
+    def duplicates(self, threshold):
+        """Отпечатки SQL, повторенные более threshold раз"""
+        counts = Counter()
+        for sql, count in self.statements.items():
+            counts[fingerprint(sql)] += count
+        return {sql: count for sql, count in counts.most_common() if count > threshold}
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.db_time += time.perf_counter() - started
+        profile.queries += 1
+        profile.statements[sql] += 1
+
+
+def _install(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(_install, dispatch_uid='auditorium_app.profiling')
+
+_template_render = Template.render
+
+
+def _profiled_render(self, context=None, request=None):
+    profile = _current.get()
+    if profile is None:
+        return _template_render(self, context, request)
+    profile.template_depth += 1
+    started, db_time = time.perf_counter(), profile.db_time
+    try:
+        return _template_render(self, context, request)
+    finally:
+        profile.template_depth -= 1
+        if not profile.template_depth:
+            # Ленивые queryset выполняются при отрисовке: их время учтено в db
+            elapsed = time.perf_counter() - started
+            profile.template_time += elapsed - (profile.db_time - db_time)
+
+
+Template.render = _profiled_render
+
+
+class RequestProfilingMiddleware:
+    """
+    Заголовок Server-Timing (db, tpl, app, total) и строка лога на каждый запрос.
+
+    Настройки: PROFILING_ENABLED (по умолчанию True) и
+    PROFILING_DUPLICATE_QUERY_THRESHOLD - сколько повторов одного SQL допустимо
+    до предупреждения (по умолчанию 5).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'PROFILING_ENABLED', True)
+        self.threshold = getattr(settings, 'PROFILING_DUPLICATE_QUERY_THRESHOLD', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        # Соединения, открытые до подключения обработчика connection_created
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    def finish(self, request, response, profile):
+        total = (time.perf_counter() - profile.started) * 1000
+        db = profile.db_time * 1000
+        template = profile.template_time * 1000
+        app = max(total - db - template, 0.0)
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={db:.1f};desc="{profile.queries} queries"',
+            f'tpl;dur={template:.1f}',
+            f'app;dur={app:.1f}',
+            f'total;dur={total:.1f}',
+        ])
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': profile.queries,
+            'db_ms': round(db, 1),
+            'template_ms': round(template, 1),
+            'app_ms': round(app, 1),
+            'total_ms': round(total, 1),
+        }
+        duplicates = profile.duplicates(self.threshold)
+        if duplicates:
+            record['duplicate_queries'] = [
+                {'sql': sql[:300], 'count': count} for sql, count in duplicates.items()
+            ]
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        elif logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record, ensure_ascii=False))
+        return response
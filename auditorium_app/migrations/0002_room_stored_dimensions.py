@@ -0,0 +1,111 @@
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Floor
+
+
+POSTGRESQL_FORWARD_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION auditorium_app_room_dimensions() RETURNS trigger AS $$
+    BEGIN
+        NEW.area := NEW.width * NEW.length;
+        NEW.volume := NEW.width * NEW.length * NEW.ceiling_height;
+        NEW.capacity_estimate := floor(NEW.width * NEW.length / 2);
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER auditorium_app_room_dimensions
+    BEFORE INSERT OR UPDATE ON auditorium_app_room
+    FOR EACH ROW EXECUTE FUNCTION auditorium_app_room_dimensions();
+    """,
+]
+
+POSTGRESQL_REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS auditorium_app_room_dimensions ON auditorium_app_room;",
+    "DROP FUNCTION IF EXISTS auditorium_app_room_dimensions();",
+]
+
+SQLITE_UPDATE_STATEMENT = """
+    UPDATE auditorium_app_room
+    SET area = NEW.width * NEW.length,
+        volume = NEW.width * NEW.length * NEW.ceiling_height,
+        capacity_estimate = CAST(NEW.width * NEW.length / 2 AS INTEGER)
+    WHERE id = NEW.id;
+"""
+
+SQLITE_FORWARD_SQL = [
+    f"""
+    CREATE TRIGGER auditorium_app_room_dimensions_insert
+    AFTER INSERT ON auditorium_app_room
+    BEGIN {SQLITE_UPDATE_STATEMENT} END;
+    """,
+    f"""
+    CREATE TRIGGER auditorium_app_room_dimensions_update
+    AFTER UPDATE OF width, length, ceiling_height ON auditorium_app_room
+    BEGIN {SQLITE_UPDATE_STATEMENT} END;
+    """,
+]
+
+SQLITE_REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS auditorium_app_room_dimensions_insert;",
+    "DROP TRIGGER IF EXISTS auditorium_app_room_dimensions_update;",
+]
+
+
+def _execute(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _execute(schema_editor, POSTGRESQL_FORWARD_SQL)
+    elif vendor == 'sqlite':
+        _execute(schema_editor, SQLITE_FORWARD_SQL)
+
+
+def drop_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _execute(schema_editor, POSTGRESQL_REVERSE_SQL)
+    elif vendor == 'sqlite':
+        _execute(schema_editor, SQLITE_REVERSE_SQL)
+
+
+def backfill_dimensions(apps, schema_editor):
+    Room = apps.get_model('auditorium_app', 'Room')
+    area = F('width') * F('length')
+    Room.objects.update(
+        area=area,
+        volume=area * F('ceiling_height'),
+        capacity_estimate=Floor(area / 2),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditorium_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='area',
+            field=models.DecimalField(db_index=True, decimal_places=4, editable=False, max_digits=16, null=True, verbose_name='Площадь (кв.м)'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='volume',
+            field=models.DecimalField(db_index=True, decimal_places=6, editable=False, max_digits=22, null=True, verbose_name='Объем (куб.м)'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='capacity_estimate',
+            field=models.PositiveIntegerField(db_index=True, editable=False, null=True, verbose_name='Оценочная вместимость'),
+        ),
+        migrations.RunPython(backfill_dimensions, migrations.RunPython.noop),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:03
+
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    Department = apps.get_model('auditorium_app', 'Department')
+    parents = dict(Department.objects.values_list('id', 'parent_id'))
+    paths = {}
+
+    def path_of(dept_id):
+        if dept_id not in paths:
+            parent_id = parents[dept_id]
+            paths[dept_id] = (path_of(parent_id) if parent_id else '') + f'{dept_id}/'
+        return paths[dept_id]
+
+    departments = list(Department.objects.only('id'))
+    for dept in departments:
+        dept.path = path_of(dept.id)
+        dept.depth = dept.path.count('/') - 1
+    Department.objects.bulk_update(departments, ['path', 'depth'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditorium_app', '0002_room_stored_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='depth',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Уровень вложенности'),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='path',
+            field=models.TextField(blank=True, db_index=True, editable=False, verbose_name='Путь в иерархии'),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:22
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+POSTGRESQL_FORWARD_SQL = [
+    # Помещение: номер (A), корпус (B), расположение (C), описание (D)
+    """
+    CREATE OR REPLACE FUNCTION auditorium_app_room_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.room_number, '')), 'A') ||
+            setweight(to_tsvector('pg_catalog.russian', coalesce(
+                (SELECT name FROM auditorium_app_building WHERE id = NEW.building_id), ''
+            )), 'B') ||
+            setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.location_in_building, '')), 'C') ||
+            setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.description, '')), 'D');
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER auditorium_app_room_search_vector
+    BEFORE INSERT OR UPDATE OF room_number, building_id, location_in_building, description
+    ON auditorium_app_room
+    FOR EACH ROW EXECUTE FUNCTION auditorium_app_room_search_vector();
+    """,
+    """
+    CREATE TRIGGER auditorium_app_building_search_vector
+    BEFORE INSERT OR UPDATE ON auditorium_app_building
+    FOR EACH ROW EXECUTE FUNCTION
+    tsvector_update_trigger(search_vector, 'pg_catalog.russian', name, address, description);
+    """,
+    # Переименование корпуса обновляет векторы его помещений
+    """
+    CREATE OR REPLACE FUNCTION auditorium_app_building_rooms_search_vector() RETURNS trigger AS $$
+    BEGIN
+        UPDATE auditorium_app_room SET building_id = NEW.id WHERE building_id = NEW.id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER auditorium_app_building_rooms_search_vector
+    AFTER UPDATE OF name ON auditorium_app_building
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION auditorium_app_building_rooms_search_vector();
+    """,
+    """
+    CREATE TRIGGER auditorium_app_department_search_vector
+    BEFORE INSERT OR UPDATE ON auditorium_app_department
+    FOR EACH ROW EXECUTE FUNCTION
+    tsvector_update_trigger(search_vector, 'pg_catalog.russian', name, description);
+    """,
+    # Заполнение существующих строк (срабатывают триггеры) и GIN-индексы
+    "UPDATE auditorium_app_building SET search_vector = NULL;",
+    "UPDATE auditorium_app_department SET search_vector = NULL;",
+    "UPDATE auditorium_app_room SET room_number = room_number;",
+    "CREATE INDEX auditorium_app_room_search_gin ON auditorium_app_room USING gin (search_vector);",
+    "CREATE INDEX auditorium_app_building_search_gin ON auditorium_app_building USING gin (search_vector);",
+    "CREATE INDEX auditorium_app_department_search_gin ON auditorium_app_department USING gin (search_vector);",
+]
+
+POSTGRESQL_REVERSE_SQL = [
+    "DROP INDEX IF EXISTS auditorium_app_room_search_gin;",
+    "DROP INDEX IF EXISTS auditorium_app_building_search_gin;",
+    "DROP INDEX IF EXISTS auditorium_app_department_search_gin;",
+    "DROP TRIGGER IF EXISTS auditorium_app_department_search_vector ON auditorium_app_department;",
+    "DROP TRIGGER IF EXISTS auditorium_app_building_rooms_search_vector ON auditorium_app_building;",
+    "DROP FUNCTION IF EXISTS auditorium_app_building_rooms_search_vector();",
+    "DROP TRIGGER IF EXISTS auditorium_app_building_search_vector ON auditorium_app_building;",
+    "DROP TRIGGER IF EXISTS auditorium_app_room_search_vector ON auditorium_app_room;",
+    "DROP FUNCTION IF EXISTS auditorium_app_room_search_vector();",
+]
+
+
+def create_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRESQL_FORWARD_SQL:
+            schema_editor.execute(statement)
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRESQL_REVERSE_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditorium_app', '0004_department_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='building',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
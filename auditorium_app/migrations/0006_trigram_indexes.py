@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:05
+
+import django.contrib.postgres.operations
+from django.db import migrations
+
+
+# Триграммные индексы для автодополнения: по UPPER(поле) - для LIKE '%...%'
+# после UPPER() и для word_similarity (<%)
+POSTGRESQL_FORWARD_SQL = [
+    "CREATE INDEX auditorium_app_room_number_trgm ON auditorium_app_room "
+    "USING gin (UPPER(room_number) gin_trgm_ops);",
+    "CREATE INDEX auditorium_app_building_name_trgm ON auditorium_app_building "
+    "USING gin (UPPER(name) gin_trgm_ops);",
+    "CREATE INDEX auditorium_app_department_name_trgm ON auditorium_app_department "
+    "USING gin (UPPER(name) gin_trgm_ops);",
+]
+
+POSTGRESQL_REVERSE_SQL = [
+    "DROP INDEX IF EXISTS auditorium_app_room_number_trgm;",
+    "DROP INDEX IF EXISTS auditorium_app_building_name_trgm;",
+    "DROP INDEX IF EXISTS auditorium_app_department_name_trgm;",
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRESQL_FORWARD_SQL:
+            schema_editor.execute(statement)
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRESQL_REVERSE_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditorium_app', '0005_search_vectors'),
+    ]
+
+    operations = [
+        # В других СУБД операция ничего не делает
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Отдельный индекс внешнего ключа building не нужен: building_id - первый
+# столбец room_building_floor_idx, он удаляется после создания составных индексов. Индекс удаляется по имени, а не через
+# AlterField: SQLite выполнил бы AlterField пересозданием таблицы, потеряв
+# триггеры хранимых размеров (миграция 0002).
+BUILDING_FK_INDEX = 'auditorium_app_room_building_id_1dca107b'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditorium_app', '0006_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['building', 'floor', 'room_number'], name='room_building_floor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['purpose', 'building', 'floor', 'room_number'], name='room_purpose_building_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['room_type', 'building', 'floor', 'room_number'], name='room_type_building_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['purpose', 'room_type', 'building', 'floor', 'room_number'], name='room_purpose_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(condition=models.Q(('department__isnull', False)), fields=['department', 'building', 'floor', 'room_number'], name='room_department_idx'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='room',
+                    name='building',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rooms', to='auditorium_app.building', verbose_name='Корпус'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    f'DROP INDEX "{BUILDING_FK_INDEX}";',
+                    f'CREATE INDEX "{BUILDING_FK_INDEX}" ON "auditorium_app_room" ("building_id");',
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Итоги по существующим помещениям (как rollups.rebuild() на исторических моделях)
+ROLLUPS = (
+    ('BuildingRollup', {'building_id': 'building_id', 'room_type': 'room_type'}),
+    ('FloorRollup', {'building_id': 'building_id', 'floor_number': 'floor'}),
+    ('DepartmentRollup', {'department_id': 'department_id'}),
+)
+
+
+def fill_rollups(apps, schema_editor):
+    Room = apps.get_model('auditorium_app', 'Room')
+    for model_name, mapping in ROLLUPS:
+        model = apps.get_model('auditorium_app', model_name)
+        rows = Room.objects.order_by().values(*mapping.values()).annotate(
+            rollup_count=models.Count('id'),
+            rollup_area=models.Sum('area'),
+            rollup_volume=models.Sum('volume'),
+        )
+        model.objects.bulk_create([
+            model(
+                **{field: row[room_field] for field, room_field in mapping.items()},
+                rooms_count=row['rollup_count'],
+                area=row['rollup_area'] or 0,
+                volume=row['rollup_volume'] or 0,
+            )
+            for row in rows
+            if None not in (row[room_field] for room_field in mapping.values())
+        ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auditorium_app', '0007_room_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentRollup',
+            fields=[
+                ('rooms_count', models.IntegerField(default=0, verbose_name='Количество помещений')),
+                ('area', models.DecimalField(decimal_places=4, default=0, max_digits=20, verbose_name='Площадь (кв.м)')),
+                ('volume', models.DecimalField(decimal_places=6, default=0, max_digits=26, verbose_name='Объем (куб.м)')),
+                ('department', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='auditorium_app.department', verbose_name='Подразделение')),
+            ],
+            options={
+                'verbose_name': 'Итоги подразделения',
+                'verbose_name_plural': 'Итоги подразделений',
+            },
+        ),
+        migrations.CreateModel(
+            name='FloorRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rooms_count', models.IntegerField(default=0, verbose_name='Количество помещений')),
+                ('area', models.DecimalField(decimal_places=4, default=0, max_digits=20, verbose_name='Площадь (кв.м)')),
+                ('volume', models.DecimalField(decimal_places=6, default=0, max_digits=26, verbose_name='Объем (куб.м)')),
+                ('floor_number', models.IntegerField(verbose_name='Номер этажа')),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='floor_rollups', to='auditorium_app.building', verbose_name='Корпус')),
+            ],
+            options={
+                'verbose_name': 'Итоги этажа',
+                'verbose_name_plural': 'Итоги этажей',
+                'unique_together': {('building', 'floor_number')},
+            },
+        ),
+        migrations.CreateModel(
+            name='BuildingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rooms_count', models.IntegerField(default=0, verbose_name='Количество помещений')),
+                ('area', models.DecimalField(decimal_places=4, default=0, max_digits=20, verbose_name='Площадь (кв.м)')),
+                ('volume', models.DecimalField(decimal_places=6, default=0, max_digits=26, verbose_name='Объем (куб.м)')),
+                ('room_type', models.CharField(choices=[('auditorium', 'Аудитория'), ('office', 'Офис'), ('laboratory', 'Лаборатория'), ('storage', 'Склад'), ('utility', 'Вспомогательное'), ('recreation', 'Отдых')], max_length=50, verbose_name='Вид помещения')),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='auditorium_app.building', verbose_name='Корпус')),
+            ],
+            options={
+                'verbose_name': 'Итоги корпуса',
+                'verbose_name_plural': 'Итоги корпусов',
+                'unique_together': {('building', 'room_type')},
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
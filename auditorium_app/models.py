@@ -1,4 +1,9 @@
-from django.db import models
+from decimal import Decimal
+
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.core.exceptions import ValidationError
 
 
@@ -10,6 +15,9 @@ class Building(models.Model):
     description = models.TextField(blank=True, verbose_name="Описание")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    
+    # Полнотекстовый индекс (PostgreSQL, поддерживается триггером, см. search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         verbose_name = "Корпус"
@@ -21,11 +29,11 @@ class Building(models.Model):
 
     def get_total_area(self):
         """Получить общую площадь корпуса"""
-        return sum(room.get_area() for room in self.rooms.all())
+        return float(self.rooms.aggregate(total=models.Sum('area'))['total'] or 0)
 
     def get_total_volume(self):
         """Получить общий объем корпуса"""
-        return sum(room.get_volume() for room in self.rooms.all())
+        return float(self.rooms.aggregate(total=models.Sum('volume'))['total'] or 0)
 
 
 class Department(models.Model):
@@ -47,6 +55,17 @@ class Department(models.Model):
     )
     description = models.TextField(blank=True, verbose_name="Описание")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    # Материализованный путь вида "1/5/12/" (id предков и самого подразделения)
+    # и глубина в дереве. Поддерживаются в save(), см. также rebuild_paths().
+    # TextField: длина пути растет с глубиной и разрядностью id и не ограничена.
+    path = models.TextField(blank=True, db_index=True, editable=False,
+                            verbose_name="Путь в иерархии")
+    depth = models.PositiveIntegerField(default=0, editable=False, verbose_name="Уровень вложенности")
+    
+    # Полнотекстовый индекс (PostgreSQL, поддерживается триггером, см. search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         verbose_name = "Подразделение"
@@ -56,32 +75,122 @@ class Department(models.Model):
     def __str__(self):
         return self.name
 
-    def get_full_path(self):
-        """Получить полный путь подразделения"""
-        path = [self.name]
+    def clean(self):
+        """Валидация данных"""
+        if self.pk and self.parent_id:
+            if self.parent_id == self.pk or self.parent_id in self.get_descendant_ids():
+                raise ValidationError("Подразделение не может быть вложено само в себя")
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._update_path()
+
+    def _update_path(self):
+        """Пересчитать путь подразделения и, при переносе, путь его поддерева"""
+        stored_paths = dict(
+            Department.objects.filter(pk__in=[self.pk, self.parent_id]).values_list('id', 'path')
+        )
+        old_path = stored_paths.get(self.pk, '')
+        new_path = f'{stored_paths.get(self.parent_id, "")}{self.pk}/'
+        new_depth = new_path.count('/') - 1
+        if new_path != old_path:
+            Department.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+            if old_path:
+                Department.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + (new_depth - (old_path.count('/') - 1)),
+                )
+        self.path, self.depth = new_path, new_depth
+
+    @classmethod
+    def rebuild_paths(cls):
+        """Полностью пересчитать пути и глубины (после массовой загрузки)"""
+        parents = dict(cls.objects.values_list('id', 'parent_id'))
+        paths = {}
+
+        def path_of(dept_id):
+            if dept_id not in paths:
+                parent_id = parents[dept_id]
+                paths[dept_id] = (path_of(parent_id) if parent_id else '') + f'{dept_id}/'
+            return paths[dept_id]
+
+        changed = []
+        for dept in cls.objects.only('id', 'parent_id', 'path', 'depth'):
+            path = path_of(dept.id)
+            if dept.path != path:
+                dept.path, dept.depth = path, path.count('/') - 1
+                changed.append(dept)
+        cls.objects.bulk_update(changed, ['path', 'depth'], batch_size=1000)
+        return len(changed)
+
+    def get_ancestor_ids(self):
+        """Получить id всех вышестоящих подразделений (от корня)"""
+        return [int(dept_id) for dept_id in self.path.split('/')[:-2]]
+
+    def get_ancestors(self):
+        """Получить все вышестоящие подразделения (от корня)"""
+        return Department.objects.filter(pk__in=self.get_ancestor_ids()).order_by('depth')
+
+    def get_depth(self):
+        """Получить уровень вложенности подразделения (0 - корень)"""
+        if self.path:
+            return self.depth
+        return len(self._walk_parents())
+
+    def _walk_parents(self):
+        parents = []
         current = self.parent
         while current:
-            path.insert(0, current.name)
+            parents.insert(0, current)
             current = current.parent
+        return parents
+
+    def get_full_path(self):
+        """Получить полный путь подразделения"""
+        if self.path:
+            ancestors = self.get_ancestors().values_list('name', flat=True) if self.parent_id else []
+            path = [*ancestors, self.name]
+        else:
+            path = [parent.name for parent in self._walk_parents()] + [self.name]
         return ' → '.join(path)
 
     def get_children(self):
         """Получить все дочерние подразделения"""
         return Department.objects.filter(parent=self)
 
+    def get_descendants(self):
+        """Получить queryset всех подчиненных подразделений"""
+        return Department.objects.filter(path__startswith=self.path).exclude(pk=self.pk)
+
+    def get_descendant_ids(self):
+        """Получить id всех подчиненных подразделений"""
+        if not self.path:
+            return []
+        return list(self.get_descendants().values_list('id', flat=True))
+
     def get_all_descendants(self):
-        """Получить все подчиненные подразделения"""
+        """Получить все подчиненные подразделения (в порядке обхода дерева)"""
+        if not self.path:
+            return []
+        children = {}
+        for dept in self.get_descendants():
+            children.setdefault(dept.parent_id, []).append(dept)
         descendants = []
-        for child in self.get_children():
-            descendants.append(child)
-            descendants.extend(child.get_all_descendants())
+        stack = list(reversed(children.get(self.pk, [])))
+        while stack:
+            dept = stack.pop()
+            descendants.append(dept)
+            stack.extend(reversed(children.get(dept.pk, [])))
         return descendants
 
 
 class Room(models.Model):
     """Модель помещения в корпусе"""
+    # Отдельный индекс не нужен: building_id - первый столбец room_building_floor_idx
+    # и ограничения уникальности (building, room_number)
     building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='rooms',
-                                verbose_name="Корпус")
+                                 db_index=False, verbose_name="Корпус")
     room_number = models.CharField(max_length=20, verbose_name="Номер комнаты")
     floor = models.PositiveIntegerField(verbose_name="Этаж")
     location_in_building = models.CharField(max_length=200, verbose_name="Расположение в корпусе")
@@ -119,18 +228,58 @@ class Room(models.Model):
                                   verbose_name="Закрепленное подразделение")
     
     description = models.TextField(blank=True, verbose_name="Описание")
+    
+    # Хранимые расчетные значения. В PostgreSQL и SQLite поддерживаются
+    # триггерами БД (см. миграцию 0002), в save() пересчитываются для инстанса.
+    area = models.DecimalField(max_digits=16, decimal_places=4, null=True, editable=False,
+                               db_index=True, verbose_name="Площадь (кв.м)")
+    volume = models.DecimalField(max_digits=22, decimal_places=6, null=True, editable=False,
+                                 db_index=True, verbose_name="Объем (куб.м)")
+    capacity_estimate = models.PositiveIntegerField(null=True, editable=False, db_index=True,
+                                                    verbose_name="Оценочная вместимость")
+    
+    # Полнотекстовый индекс: номер, корпус, расположение и описание
+    # (PostgreSQL, поддерживается триггером, см. search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    _loaded_values = {}  # см. from_db()
+
     class Meta:
         verbose_name = "Помещение"
         verbose_name_plural = "Помещения"
         ordering = ['building', 'floor', 'room_number']
         unique_together = ['building', 'room_number']
+        # Под фильтры rooms_list (корпус, назначение, вид) и его порядок
+        # (building_id, floor, room_number): каждое сочетание фильтров читает
+        # индекс в нужном порядке, без сортировки. Частичный индекс - для
+        # помещений подразделения в department_detail.
+        indexes = [
+            models.Index(fields=['building', 'floor', 'room_number'],
+                         name='room_building_floor_idx'),
+            models.Index(fields=['purpose', 'building', 'floor', 'room_number'],
+                         name='room_purpose_building_idx'),
+            models.Index(fields=['room_type', 'building', 'floor', 'room_number'],
+                         name='room_type_building_idx'),
+            models.Index(fields=['purpose', 'room_type', 'building', 'floor', 'room_number'],
+                         name='room_purpose_type_idx'),
+            models.Index(fields=['department', 'building', 'floor', 'room_number'],
+                         name='room_department_idx',
+                         condition=models.Q(department__isnull=False)),
+        ]
 
     def __str__(self):
         return f"{self.building.name}, комната {self.room_number}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значения, сохраненные в БД: нужны сигналам, чтобы учесть перенос помещения
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def clean(self):
         """Валидация данных"""
         if self.width is not None and self.length is not None:
@@ -143,17 +292,52 @@ class Room(models.Model):
             if self.floor < 1:
                 raise ValidationError("Этаж должен быть положительным числом")
 
+    def save(self, *args, **kwargs):
+        self.update_dimensions()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'area', 'volume', 'capacity_estimate'}
+        super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields
+        }
+
+    def update_dimensions(self):
+        """Пересчитать хранимые площадь, объем и вместимость по размерам помещения"""
+        if None in (self.width, self.length, self.ceiling_height):
+            return
+        width, length, ceiling_height = (
+            Decimal(str(value)) for value in (self.width, self.length, self.ceiling_height)
+        )
+        self.area = width * length
+        self.volume = self.area * ceiling_height
+        self.capacity_estimate = int(self.area / 2)
+
+    def _stored_dimensions_stale(self):
+        """Размеры изменены в памяти после загрузки: хранимые значения устарели"""
+        return any(
+            field in self.__dict__
+            and (field not in self._loaded_values or self._loaded_values[field] != self.__dict__[field])
+            for field in ('width', 'length', 'ceiling_height')
+        )
+
     def get_area(self):
         """Получить площадь помещения в квадратных метрах"""
-        return float(self.width * self.length)
+        if self.area is None or self._stored_dimensions_stale():
+            self.update_dimensions()
+        return float(self.area)
 
     def get_volume(self):
         """Получить объем помещения в кубических метрах"""
-        return float(self.width * self.length * self.ceiling_height)
+        if self.volume is None or self._stored_dimensions_stale():
+            self.update_dimensions()
+        return float(self.volume)
 
     def get_capacity_estimate(self):
         """Оценочная вместимость помещения (примерно 2 кв.м на человека)"""
-        return int(self.get_area() / 2)
+        if self.capacity_estimate is None or self._stored_dimensions_stale():
+            self.update_dimensions()
+        return self.capacity_estimate
 
     def get_full_name(self):
         """Получить полное название помещения"""
@@ -175,4 +359,50 @@ class BuildingFloor(models.Model):
         ordering = ['building', 'floor_number']
 
     def __str__(self):
-        return f"{self.building.name}, {self.floor_number} этаж"
\ No newline at end of file
+        return f"{self.building.name}, {self.floor_number} этаж"
+
+class RoomTotals(models.Model):
+    """Итоги по помещениям: число, площадь и объем"""
+    rooms_count = models.IntegerField(default=0, verbose_name="Количество помещений")
+    area = models.DecimalField(max_digits=20, decimal_places=4, default=0, verbose_name="Площадь (кв.м)")
+    volume = models.DecimalField(max_digits=26, decimal_places=6, default=0, verbose_name="Объем (куб.м)")
+
+    class Meta:
+        abstract = True
+
+
+# Таблицы итогов обновляются приращениями при каждом изменении помещения
+# (см. rollups.py и signals.py); пересчет с нуля - команда rebuild_rollups.
+
+class BuildingRollup(RoomTotals):
+    """Итоги корпуса по видам помещений"""
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='rollups',
+                                 verbose_name="Корпус")
+    room_type = models.CharField(max_length=50, choices=Room.ROOM_TYPE_CHOICES, verbose_name="Вид помещения")
+
+    class Meta:
+        verbose_name = "Итоги корпуса"
+        verbose_name_plural = "Итоги корпусов"
+        unique_together = ['building', 'room_type']
+
+
+class FloorRollup(RoomTotals):
+    """Итоги этажа корпуса (ключ - как у BuildingFloor)"""
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='floor_rollups',
+                                 verbose_name="Корпус")
+    floor_number = models.IntegerField(verbose_name="Номер этажа")
+
+    class Meta:
+        verbose_name = "Итоги этажа"
+        verbose_name_plural = "Итоги этажей"
+        unique_together = ['building', 'floor_number']
+
+
+class DepartmentRollup(RoomTotals):
+    """Итоги помещений, закрепленных за подразделением (без дочерних)"""
+    department = models.OneToOneField(Department, on_delete=models.CASCADE, primary_key=True,
+                                      related_name='rollup', verbose_name="Подразделение")
+
+    class Meta:
+        verbose_name = "Итоги подразделения"
+        verbose_name_plural = "Итоги подразделений"
\ No newline at end of file
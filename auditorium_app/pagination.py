@@ -0,0 +1,204 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import F, Field, Func, Q, Value
+from django.utils.functional import cached_property
+
+
+# СУБД, сравнивающие значения строк (a, b) > (x, y) с использованием индекса
+ROW_COMPARISON_VENDORS = ('postgresql', 'sqlite')
+
+
+class RowValue(Func):
+    """Значение строки (a, b, c) для сравнения ключей курсора"""
+    template = '(%(expressions)s)'
+    output_field = Field()
+
+
+def estimate_count(queryset, exact_below=10000):
+    """
+    Оценка количества строк в выборке.
+
+    В PostgreSQL берется оценка планировщика (EXPLAIN), а точный COUNT(*)
+    выполняется только для небольших выборок. В остальных СУБД - обычный count().
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]['Plan']['Plan Rows'])
+    if estimate < exact_below:
+        return queryset.count()
+    return estimate
+
+
+def encode_cursor(values, direction):
+    """Упаковать значения ключа сортировки в непрозрачный токен"""
+    payload = json.dumps({'k': values, 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковать токен курсора, None - если токен пуст или поврежден"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction = payload['k'], payload['d']
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        return None
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        return None
+    return values, direction
+
+
+class CursorPage:
+    """Страница курсорной пагинации (интерфейс близок к django Page)"""
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Курсорная (keyset) пагинация.
+
+    Страницы выбираются условием по ключу сортировки вместо OFFSET, поэтому
+    стоимость запроса не зависит от номера страницы. Поля ordering должны
+    однозначно упорядочивать выборку. Поддерживаются и queryset из values(),
+    если поля ordering входят в выборку.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = per_page
+
+    @cached_property
+    def count(self):
+        """Оценочное количество объектов (см. estimate_count)"""
+        return estimate_count(self.queryset)
+
+    def _fields(self):
+        return [(field.lstrip('-'), field.startswith('-')) for field in self.ordering]
+
+    def _key(self, obj):
+        if isinstance(obj, dict):
+            return [obj[name] for name, _ in self._fields()]
+        return [getattr(obj, name) for name, _ in self._fields()]
+
+    def _seek(self, queryset, values, direction):
+        """Выборка "строго после/до ключа" в порядке сортировки"""
+        fields = self._fields()
+        if (
+            connections[queryset.db].vendor in ROW_COMPARISON_VENDORS
+            and len({descending for _, descending in fields}) == 1
+        ):
+            return self._row_seek(queryset, values, direction)
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(fields, values):
+            forward = (direction == 'next') != descending
+            condition |= Q(**equal, **{f'{name}__{"gt" if forward else "lt"}': value})
+            equal[name] = value
+        # Граница по первому полю - условие доступа к индексу, которое
+        # планировщик из цепочки OR не выводит
+        name, descending = fields[0]
+        forward = (direction == 'next') != descending
+        return queryset.filter(condition, **{f'{name}__{"gte" if forward else "lte"}': values[0]})
+
+    def _row_seek(self, queryset, values, direction):
+        """
+        Ключ, сортируемый в одном направлении, сравнивается как значение строки
+        (a, b, c) > (%s, %s, %s): это нижняя граница составного индекса, и
+        страница читается с нужной позиции индекса без просмотра предыдущих строк
+        """
+        names = [name for name, _ in self._fields()]
+        query = queryset.query.chain()
+        bounds = []
+        for name, value in zip(names, values):
+            output_field = F(name).resolve_expression(query).output_field
+            bounds.append(Value(output_field.get_prep_value(value), output_field=output_field))
+        forward = (direction == 'next') != self._fields()[0][1]
+        return queryset.alias(cursor_key=RowValue(*map(F, names))).filter(
+            **{f'cursor_key__{"gt" if forward else "lt"}': RowValue(*bounds)}
+        )
+
+    def _cursor_queryset(self, token):
+        """
+        Выборка после курсора и сам курсор; для пустого или поврежденного
+        токена (значения не того числа или типа) - вся выборка и None.
+        """
+        cursor = decode_cursor(token)
+        if cursor is None or len(cursor[0]) != len(self.ordering):
+            return self.queryset, None
+        try:
+            return self._seek(self.queryset, *cursor), cursor
+        except (ValueError, TypeError, ValidationError):
+            return self.queryset, None
+
+    def _page_queryset(self, token):
+        """Выборка страницы (на одну строку больше per_page), курсор и направление"""
+        queryset, cursor = self._cursor_queryset(token)
+        direction = cursor[1] if cursor else 'next'
+
+        if direction == 'next':
+            queryset = queryset.order_by(*self.ordering)
+        else:
+            queryset = queryset.order_by(*[
+                name if descending else f'-{name}' for name, descending in self._fields()
+            ])
+        return queryset[:self.per_page + 1], cursor, direction
+
+    def _page(self, object_list, cursor, direction):
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if direction == 'prev':
+            object_list.reverse()
+
+        next_cursor = previous_cursor = None
+        if object_list:
+            if direction == 'prev' or has_more:
+                next_cursor = encode_cursor(self._key(object_list[-1]), 'next')
+            if cursor and (direction == 'next' or has_more):
+                previous_cursor = encode_cursor(self._key(object_list[0]), 'prev')
+        return CursorPage(object_list, self, next_cursor, previous_cursor)
+
+    def get_page(self, token):
+        queryset, cursor, direction = self._page_queryset(token)
+        return self._page(list(queryset), cursor, direction)
+
+    async def aget_page(self, token):
+        """Асинхронный вариант get_page (async ORM)"""
+        queryset, cursor, direction = self._page_queryset(token)
+        return self._page([obj async for obj in queryset], cursor, direction)
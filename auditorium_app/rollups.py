@@ -0,0 +1,266 @@
+"""
+Таблицы итогов помещений: по корпусу и виду помещения (BuildingRollup), по
+этажу корпуса (FloorRollup) и по подразделению (DepartmentRollup).
+
+Сигналы помещения (signals.py) передают в apply_room_change() значения до и
+после изменения, и затронутые строки итогов меняются на разницу - без
+повторного чтения помещений. При удалении корпуса его помещения вычитаются
+из итогов разом (remove_building()), поштучные разницы не применяются. Изменения в обход сигналов (bulk_create,
+QuerySet.update, загрузка COPY) требуют rebuild(); drift() сравнивает итоги
+с пересчетом с нуля.
+
+department_subtree_totals() суммирует итоги подразделений по всему поддереву
+одним рекурсивным запросом.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import BuildingRollup, Department, DepartmentRollup, FloorRollup, Room
+
+# Поля помещения, от которых зависят итоги
+ROOM_ROLLUP_FIELDS = ('building_id', 'floor', 'room_type', 'department_id', 'area', 'volume')
+
+# Таблица итогов: {поле ключа итогов: поле помещения}
+ROLLUPS = (
+    (BuildingRollup, {'building_id': 'building_id', 'room_type': 'room_type'}),
+    (FloorRollup, {'building_id': 'building_id', 'floor_number': 'floor'}),
+    (DepartmentRollup, {'department_id': 'department_id'}),
+)
+
+ZERO = Decimal(0)
+
+# Точность хранения итогов: сравнение не зависит от представления чисел в СУБД
+AREA_PLACES = Decimal('0.0001')
+VOLUME_PLACES = Decimal('0.000001')
+
+
+def room_values(room, loaded=False):
+    """Значения помещения для итогов: текущие или загруженные из БД (loaded)"""
+    if loaded:
+        values = room._loaded_values
+        if not all(field in values for field in ROOM_ROLLUP_FIELDS):
+            return None
+        return {field: values[field] for field in ROOM_ROLLUP_FIELDS}
+    return {field: getattr(room, field) for field in ROOM_ROLLUP_FIELDS}
+
+
+def load_stored_values(room):
+    """
+    Дочитать из БД сохраненные значения полей итогов, которых нет в
+    room._loaded_values (помещение загружено через only()/defer()). Вызывается
+    до сохранения и удаления, пока в БД еще старые значения.
+    """
+    missing = [field for field in ROOM_ROLLUP_FIELDS if field not in room._loaded_values]
+    if room.pk is None or not missing:
+        return
+    stored = Room.objects.filter(pk=room.pk).values(*missing).first()
+    if stored is not None:
+        room._loaded_values = {**room._loaded_values, **stored}
+
+
+def _key(mapping, values):
+    key = {rollup_field: values[room_field] for rollup_field, room_field in mapping.items()}
+    return None if None in key.values() else key
+
+
+def _totals(values, sign):
+    return sign, sign * (values['area'] or ZERO), sign * (values['volume'] or ZERO)
+
+
+def _apply(model, key, count, area, volume):
+    if not (count or area or volume):
+        return
+    changes = {
+        'rooms_count': F('rooms_count') + count,
+        'area': F('area') + area,
+        'volume': F('volume') + volume,
+    }
+    if model.objects.filter(**key).update(**changes) or count <= 0:
+        # Нет строки для вычитания - она удалена каскадом вместе с корпусом
+        # или подразделением
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, rooms_count=count, area=area, volume=volume)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос
+        model.objects.filter(**key).update(**changes)
+
+
+def apply_room_change(old, new):
+    """
+    Обновить итоги на разницу между значениями помещения old и new
+    (room_values(); None - помещения не было / больше нет).
+    """
+    with transaction.atomic():
+        for model, mapping in ROLLUPS:
+            old_key = _key(mapping, old) if old else None
+            new_key = _key(mapping, new) if new else None
+            if old_key is not None and old_key == new_key:
+                removed, added = _totals(old, -1), _totals(new, 1)
+                _apply(model, new_key, *(a + r for a, r in zip(added, removed)))
+                continue
+            if old_key is not None:
+                _apply(model, old_key, *_totals(old, -1))
+            if new_key is not None:
+                _apply(model, new_key, *_totals(new, 1))
+
+
+def _building_department_totals(building_id, aggregate):
+    return Subquery(
+        Room.objects.filter(building_id=building_id, department_id=OuterRef('department_id'))
+        .order_by().values('department_id').annotate(total=aggregate).values('total')
+    )
+
+
+def remove_building(building_id):
+    """
+    Убрать из итогов все помещения корпуса перед его удалением - вместо
+    поштучного вычитания при каскадном удалении помещений: строки итогов
+    корпуса удаляются, итоги подразделений уменьшаются одним UPDATE на суммы
+    по помещениям корпуса (сгруппированные подзапросы).
+    """
+    with transaction.atomic():
+        BuildingRollup.objects.filter(building_id=building_id).delete()
+        FloorRollup.objects.filter(building_id=building_id).delete()
+        DepartmentRollup.objects.filter(
+            department_id__in=Room.objects.filter(building_id=building_id).values('department_id')
+        ).update(
+            rooms_count=F('rooms_count') - _building_department_totals(building_id, Count('id')),
+            area=F('area') - _building_department_totals(
+                building_id, Coalesce(Sum('area'), Value(ZERO))
+            ),
+            volume=F('volume') - _building_department_totals(
+                building_id, Coalesce(Sum('volume'), Value(ZERO))
+            ),
+        )
+
+
+def compute():
+    """Итоги с нуля по помещениям: {модель: {ключ (кортеж): (число, площадь, объем)}}"""
+    result = {}
+    for model, mapping in ROLLUPS:
+        rows = Room.objects.order_by().values(*mapping.values()).annotate(
+            rollup_count=Count('id'), rollup_area=Sum('area'), rollup_volume=Sum('volume'),
+        )
+        result[model] = {
+            tuple(row[field] for field in mapping.values()): (
+                row['rollup_count'], row['rollup_area'] or ZERO, row['rollup_volume'] or ZERO,
+            )
+            for row in rows
+            if None not in (row[field] for field in mapping.values())
+        }
+    return result
+
+
+def stored():
+    """Текущее содержимое таблиц итогов (строки без помещений не учитываются)"""
+    result = {}
+    for model, mapping in ROLLUPS:
+        rows = model.objects.values_list(*mapping, 'rooms_count', 'area', 'volume')
+        result[model] = {
+            tuple(row[:len(mapping)]): tuple(row[len(mapping):])
+            for row in rows
+            if row[len(mapping)] or row[-2] or row[-1]
+        }
+    return result
+
+
+def _normalized(totals):
+    count, area, volume = totals
+    return count, Decimal(area).quantize(AREA_PLACES), Decimal(volume).quantize(VOLUME_PLACES)
+
+
+def drift(expected=None):
+    """Расхождения итогов с пересчетом: [(модель, ключ, ожидается, сохранено)]"""
+    expected = compute() if expected is None else expected
+    actual = stored()
+    differences = []
+    for model, _ in ROLLUPS:
+        keys = expected[model].keys() | actual[model].keys()
+        for key in sorted(keys, key=str):
+            want = _normalized(expected[model].get(key, (0, ZERO, ZERO)))
+            have = _normalized(actual[model].get(key, (0, ZERO, ZERO)))
+            if want != have:
+                differences.append((model, key, want, have))
+    return differences
+
+
+def rebuild():
+    """Пересчитать все итоги с нуля; возвращает найденные расхождения"""
+    expected = compute()
+    with transaction.atomic():
+        differences = drift(expected)
+        for model, mapping in ROLLUPS:
+            model.objects.all().delete()
+            model.objects.bulk_create([
+                model(
+                    **dict(zip(mapping, key)),
+                    rooms_count=count, area=area, volume=volume,
+                )
+                for key, (count, area, volume) in expected[model].items()
+            ], batch_size=5000)
+    return differences
+
+
+# Обход поддерева: каждое подразделение помечается дочерним подразделением
+# корня, в ветви которого находится (NULL - сам корень), и итоги
+# DepartmentRollup суммируются по ветвям
+SUBTREE_TOTALS_SQL = """
+    WITH RECURSIVE subtree (id, branch_id) AS (
+        SELECT id, CAST(NULL AS bigint) FROM {department} WHERE id = %s
+        UNION ALL
+        SELECT d.id, COALESCE(s.branch_id, d.id)
+        FROM {department} d JOIN subtree s ON d.parent_id = s.id
+    )
+    SELECT s.branch_id, b.name, COUNT(*),
+           COALESCE(SUM(r.rooms_count), 0), COALESCE(SUM(r.area), 0), COALESCE(SUM(r.volume), 0)
+    FROM subtree s
+    LEFT JOIN {rollup} r ON r.department_id = s.id
+    LEFT JOIN {department} b ON b.id = COALESCE(s.branch_id, s.id)
+    GROUP BY s.branch_id, b.name
+    ORDER BY b.name, s.branch_id
+"""
+
+
+def _subtree_row(departments, count, area, volume):
+    return {
+        'departments': departments,
+        'rooms_count': int(count),
+        'area': Decimal(str(area)).quantize(AREA_PLACES),
+        'volume': Decimal(str(volume)).quantize(VOLUME_PLACES),
+    }
+
+
+def department_subtree_totals(department_id):
+    """
+    Итоги подразделения с учетом всех подчиненных одним запросом:
+    {'id', 'name', 'own': собственные, 'total': по всему поддереву,
+    'children': [по ветвям дочерних подразделений, с id и name]}.
+    None - подразделения нет.
+    """
+    quote = connection.ops.quote_name
+    sql = SUBTREE_TOTALS_SQL.format(
+        department=quote(Department._meta.db_table),
+        rollup=quote(DepartmentRollup._meta.db_table),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [department_id])
+        rows = cursor.fetchall()
+
+    own, children = None, []
+    for branch_id, name, *totals in rows:
+        if branch_id is None:
+            own = {'name': name, **_subtree_row(*totals)}
+        else:
+            children.append({'id': branch_id, 'name': name, **_subtree_row(*totals)})
+    if own is None:
+        return None
+    total = {
+        field: own[field] + sum(child[field] for child in children)
+        for field in ('departments', 'rooms_count', 'area', 'volume')
+    }
+    return {'id': department_id, 'name': own.pop('name'), 'own': own, 'total': total, 'children': children}
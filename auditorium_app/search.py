@@ -0,0 +1,153 @@
+"""
+Полнотекстовый поиск по помещениям, корпусам и подразделениям.
+
+В PostgreSQL используются хранимые столбцы search_vector (конфигурация
+pg_catalog.russian), которые поддерживают триггеры БД, и GIN-индексы по ним
+(см. миграцию 0005). Вектор помещения включает и наименование корпуса.
+Совпадения отбираются по GIN-индексу, ts_rank считается по всем совпадениям:
+отсечение кандидатов до ранжирования возвращало бы не лучшие строки, а те, что
+СУБД прочитала первыми.
+В остальных СУБД - поиск подстроки (icontains) без ранжирования.
+
+Переименование корпуса пересчитывает векторы всех его помещений одним UPDATE в
+той же транзакции (триггер auditorium_app_building_rooms_search_vector): для
+корпуса с тысячами помещений это тысячи перезаписанных строк и их блокировки до
+конца транзакции. Переименования крупных корпусов лучше выполнять вне часов
+нагрузки.
+
+Автодополнение (autocomplete) ищет по номеру помещения и названиям корпусов и
+подразделений через триграммные GIN-индексы pg_trgm (миграция 0006), устойчиво
+к опечаткам, и кеширует ответы на частые префиксы в памяти процесса (кеш
+autocomplete, см. settings.CACHES).
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Case, CharField, F, FloatField, IntegerField, Q, Value, When
+from django.db.models.functions import Upper
+
+from .models import Building, Department, Room
+
+SEARCH_CONFIG = 'russian'
+
+# Поля для поиска подстроки вне PostgreSQL
+FALLBACK_FIELDS = {
+    Room: ('room_number', 'building__name', 'location_in_building', 'description'),
+    Building: ('name', 'address', 'description'),
+    Department: ('name', 'description'),
+}
+
+
+def _search(queryset, text, limit, tiebreak):
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', *tiebreak)[:limit]
+    condition = Q()
+    for field in FALLBACK_FIELDS[queryset.model]:
+        condition |= Q(**{f'{field}__icontains': text})
+    return queryset.filter(condition).annotate(rank=Value(0.0)).order_by(*tiebreak)[:limit]
+
+
+def search_rooms(text, limit=20):
+    """Помещения по номеру, корпусу, расположению и описанию (по убыванию релевантности)"""
+    return _search(
+        Room.objects.select_related('building', 'department'), text, limit,
+        ('building_id', 'floor', 'room_number'),
+    )
+
+
+def search_buildings(text, limit=20):
+    """Корпуса по наименованию, адресу и описанию"""
+    return _search(Building.objects.all(), text, limit, ('name', 'id'))
+
+
+def search_departments(text, limit=20):
+    """Подразделения по названию и описанию"""
+    return _search(Department.objects.all(), text, limit, ('name', 'id'))
+
+
+SEARCHES = {
+    'rooms': search_rooms,
+    'buildings': search_buildings,
+    'departments': search_departments,
+}
+
+
+# Автодополнение: {тип: (модель, поле-подпись, корпус, наименование корпуса)}
+AUTOCOMPLETE_SOURCES = {
+    'rooms': (Room, 'room_number', F('building_id'), F('building__name')),
+    'buildings': (Building, 'name', F('id'), F('name')),
+    'departments': (Department, 'name', Value(None, IntegerField()), Value(None, CharField())),
+}
+
+# Короче этого pg_trgm не дает осмысленного сходства - только поиск подстроки
+TRIGRAM_MIN_LENGTH = 3
+
+
+def _autocomplete_queryset(kind, text):
+    model, field, building_id, building_name = AUTOCOMPLETE_SOURCES[kind]
+    queryset = model.objects.all()
+    prefix_bonus = Case(
+        When(**{f'{field}__istartswith': text}, then=Value(1.0)),
+        default=Value(0.0), output_field=FloatField(),
+    )
+    if connection.vendor == 'postgresql':
+        # Индекс gin_trgm_ops построен по UPPER(поле): icontains в PostgreSQL
+        # сравнивает UPPER(...), а триграммы от регистра не зависят
+        queryset = queryset.alias(match=Upper(field))
+        condition = Q(match__contains=text.upper())
+        score = prefix_bonus
+        if len(text) >= TRIGRAM_MIN_LENGTH:
+            condition |= Q(match__trigram_word_similar=text)
+            score = prefix_bonus + TrigramWordSimilarity(text, field)
+    else:
+        condition = Q(**{f'{field}__icontains': text})
+        score = prefix_bonus
+    # Аннотации в одинаковом порядке: столбцы UNION ALL сопоставляются по позиции
+    return queryset.filter(condition).annotate(
+        kind=Value(kind),
+        object_id=F('id'),
+        label=F(field),
+        context_building_id=building_id,
+        context_building=building_name,
+        score=score,
+    ).values(
+        'kind', 'object_id', 'label', 'context_building_id', 'context_building', 'score',
+    ).order_by()
+
+
+def _autocomplete_key(text, limit, kinds):
+    digest = hashlib.md5(text.lower().encode()).hexdigest()
+    return f"autocomplete:{','.join(kinds)}:{limit}:{digest}"
+
+
+def autocomplete(text, limit=10, kinds=tuple(AUTOCOMPLETE_SOURCES)):
+    """
+    Лучшие limit совпадений по всем типам одним запросом (UNION ALL):
+    сначала совпадения по префиксу, затем по сходству триграмм.
+    Ответы кешируются на AUTOCOMPLETE_CACHE_TIMEOUT секунд.
+    """
+    cache = caches['autocomplete']
+    key = _autocomplete_key(text, limit, kinds)
+    results = cache.get(key)
+    if results is None:
+        first, *rest = [_autocomplete_queryset(kind, text) for kind in kinds]
+        queryset = first.union(*rest, all=True) if rest else first
+        results = [
+            {
+                'type': row['kind'],
+                'id': row['object_id'],
+                'label': row['label'],
+                'building_id': row['context_building_id'],
+                'building': row['context_building'],
+                'score': round(float(row['score']), 3),
+            }
+            for row in queryset.order_by('-score', 'label')[:limit]
+        ]
+        cache.set(key, results, getattr(settings, 'AUTOCOMPLETE_CACHE_TIMEOUT', 60))
+    return results
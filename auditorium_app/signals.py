@@ -0,0 +1,133 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import rollups, stats_cache
+from .models import Building, Department, Room
+
+# Поля помещения, от которых зависит статистика
+ROOM_STATISTICS_FIELDS = ('building_id', 'room_type', 'area', 'volume')
+
+
+def _touch_buildings(*building_ids):
+    """Обновить updated_at корпусов, чтобы сбросить их валидаторы (ETag/Last-Modified)"""
+    building_ids = {building_id for building_id in building_ids if building_id}
+    if building_ids:
+        Building.objects.filter(pk__in=building_ids).update(updated_at=timezone.now())
+
+
+def _deleted_with_building(origin):
+    """
+    Помещение удаляется каскадом вместе с корпусом: итоги и статистику
+    обновляют обработчики корпуса (building_deleting, building_changed_statistics)
+    """
+    if isinstance(origin, QuerySet):
+        return origin.model is Building
+    return isinstance(origin, Building)
+
+
+@receiver(pre_save, sender=Room)
+@receiver(pre_delete, sender=Room)
+def room_loading_stored_values(sender, instance, origin=None, **kwargs):
+    """Старые значения для итогов, не загруженные в инстанс (only()/defer()), - из БД"""
+    if not _deleted_with_building(origin):
+        rollups.load_stored_values(instance)
+
+
+def _deleted_room_values(instance):
+    # Отложенные поля удаленного помещения из БД уже не дочитать
+    return rollups.room_values(instance, loaded=True) or rollups.room_values(instance)
+
+
+@receiver(pre_delete, sender=Department)
+def department_deleting(sender, instance, **kwargs):
+    """
+    Помещения подразделения отвязываются от него UPDATE без сигналов (SET_NULL):
+    корпуса этих помещений запоминаются, чтобы сбросить их валидаторы
+    """
+    instance._room_building_ids = list(
+        Room.objects.filter(department=instance).order_by().values_list('building_id', flat=True).distinct()
+    )
+
+
+@receiver(post_delete, sender=Department)
+def department_deleted(sender, instance, **kwargs):
+    _touch_buildings(*getattr(instance, '_room_building_ids', ()))
+
+
+@receiver(post_save, sender=Room)
+def room_saved(sender, instance, created, **kwargs):
+    """Помещение перенесено в другой корпус - старый корпус тоже изменился"""
+    old_building_id = instance._loaded_values.get('building_id')
+    if old_building_id and old_building_id != instance.building_id:
+        _touch_buildings(old_building_id)
+
+
+@receiver(post_delete, sender=Room)
+def room_deleted(sender, instance, origin=None, **kwargs):
+    """Удаление помещения меняет статистику корпуса"""
+    if _deleted_with_building(origin):
+        return
+    _touch_buildings(_deleted_room_values(instance)['building_id'])
+
+
+@receiver(post_save, sender=Room)
+def room_saved_statistics(sender, instance, created, **kwargs):
+    """
+    Обновить итоги помещения, затем сбросить статистику его корпусов, если
+    изменились учитываемые поля. Сброс - строго после изменения итогов: иначе
+    параллельный пересчет прочитал бы прежние итоги и сохранил их как свежие.
+    """
+    old = None if created else rollups.room_values(instance, loaded=True)
+    if created or old is not None:
+        rollups.apply_room_change(old, rollups.room_values(instance))
+
+    loaded = instance._loaded_values
+    if not created and all(
+        field in loaded and loaded[field] == getattr(instance, field)
+        for field in ROOM_STATISTICS_FIELDS
+    ):
+        return
+    names = {stats_cache.GLOBAL, stats_cache.BUILDINGS, stats_cache.building_key(instance.building_id)}
+    if loaded.get('building_id'):
+        names.add(stats_cache.building_key(loaded['building_id']))
+    stats_cache.invalidate(*names)
+
+
+@receiver(post_delete, sender=Room)
+def room_deleted_statistics(sender, instance, origin=None, **kwargs):
+    """Вычесть помещение из итогов, затем сбросить статистику"""
+    if _deleted_with_building(origin):
+        return
+    old = _deleted_room_values(instance)
+    rollups.apply_room_change(old, None)
+    stats_cache.invalidate(
+        stats_cache.GLOBAL, stats_cache.BUILDINGS, stats_cache.building_key(old['building_id'])
+    )
+
+
+@receiver(pre_delete, sender=Building)
+def building_deleting(sender, instance, **kwargs):
+    """Помещения корпуса вычитаются из итогов разом, до их каскадного удаления"""
+    rollups.remove_building(instance.pk)
+
+
+@receiver(post_save, sender=Building)
+@receiver(post_delete, sender=Building)
+def building_changed_statistics(sender, instance, **kwargs):
+    """
+    Корпус входит в список корпусов, его удаление меняет и статистику по типам
+    помещений; статистика корпуса хранит и его отсутствие
+    """
+    stats_cache.invalidate(
+        stats_cache.GLOBAL, stats_cache.BUILDINGS, stats_cache.building_key(instance.pk)
+    )
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def department_changed_statistics(sender, instance, created=True, **kwargs):
+    """Общая статистика учитывает только число подразделений"""
+    if created:
+        stats_cache.invalidate(stats_cache.GLOBAL)
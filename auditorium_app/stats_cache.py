@@ -0,0 +1,153 @@
+"""
+Кеш статистики: общей (главная страница, список корпусов) и по корпусам
+(API статистики корпуса).
+
+Запись кеша хранит значение вместе с метками свежести. Сигналы (signals.py)
+сбрасывают только затронутые записи, меняя их метку, а само значение остается
+в кеше как устаревшее. При промахе пересчитывает один запрос (блокировка
+через cache.add); остальные получают устаревшее значение, а если его нет -
+ждут результата. Свежая запись живет STATS_CACHE_TIMEOUT секунд, устаревшая
+хранится STATS_CACHE_STALE_TIMEOUT секунд.
+
+Сброс должен быть виден всем процессам (в т.ч. командам управления), поэтому
+в развертывании из нескольких процессов кеш - общий (REDIS_URL, см. settings).
+Внутри транзакции метка меняется сразу и еще раз после фиксации: пересчет,
+успевший прочитать незафиксированные изменения в старом виде, не останется
+свежим.
+
+Запись может хранить версию данных (например, ETag): значение другой версии
+не отдается даже как устаревшее, чтобы тело ответа не расходилось с его ETag.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+# Записи: корпуса с итогами (главная страница и список корпусов), остальная
+# статистика главной страницы и статистика каждого корпуса (building_key())
+BUILDINGS = 'buildings'
+GLOBAL = 'global'
+
+# Метка, меняющаяся при сбросе всего кеша (массовая загрузка данных)
+_ALL = 'all'
+
+_WAIT_INTERVAL = 0.05
+
+_counters_lock = threading.Lock()
+_counters = dict.fromkeys(('hits', 'misses', 'stale', 'waits', 'recomputes'), 0)
+
+
+def building_key(building_id):
+    return f'building:{building_id}'
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _entry_key(name):
+    return f'stats:entry:{name}'
+
+
+def _stamp_key(name):
+    return f'stats:stamp:{name}'
+
+
+def _lock_key(name):
+    return f'stats:lock:{name}'
+
+
+def _read(name, version=None):
+    """(значение, свежее ли) или None, если записи этой версии нет"""
+    entry_key, stamp_key, all_key = _entry_key(name), _stamp_key(name), _stamp_key(_ALL)
+    found = cache.get_many([entry_key, stamp_key, all_key])
+    entry = found.get(entry_key)
+    if entry is None or entry.get('version') != version:
+        return None
+    stamps = (found.get(stamp_key, 0), found.get(all_key, 0))
+    return entry['value'], entry['stamps'] == stamps and entry['expires'] > time.time()
+
+
+def _compute(name, compute, version):
+    # Метки до расчета: сброс во время расчета оставит результат устаревшим
+    found = cache.get_many([_stamp_key(name), _stamp_key(_ALL)])
+    stamps = (found.get(_stamp_key(name), 0), found.get(_stamp_key(_ALL), 0))
+    value = compute()
+    cache.set(_entry_key(name), {
+        'value': value,
+        'version': version,
+        'stamps': stamps,
+        'expires': time.time() + _setting('STATS_CACHE_TIMEOUT', 300),
+    }, _setting('STATS_CACHE_STALE_TIMEOUT', 3600))
+    _count('recomputes')
+    return value
+
+
+def get_or_compute(name, compute, version=None):
+    """
+    Значение записи name; при промахе compute() выполняет только один запрос.
+    version - версия данных, для которой годится значение (None - любая).
+    """
+    cached = _read(name, version)
+    if cached is not None and cached[1]:
+        _count('hits')
+        return cached[0]
+    _count('misses')
+
+    lock_timeout = _setting('STATS_CACHE_LOCK_TIMEOUT', 10)
+    if cache.add(_lock_key(name), 1, lock_timeout):
+        try:
+            return _compute(name, compute, version)
+        finally:
+            cache.delete(_lock_key(name))
+    if cached is not None:
+        _count('stale')
+        return cached[0]
+
+    # Значения еще нет: ждем пересчета другим запросом, не дольше блокировки
+    _count('waits')
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(_WAIT_INTERVAL)
+        cached = _read(name, version)
+        if cached is not None:
+            return cached[0]
+        if cache.get(_lock_key(name)) is None:
+            break
+    return _compute(name, compute, version)
+
+
+def _stamp(names):
+    stamp = time.time_ns()
+    cache.set_many({_stamp_key(name): stamp for name in names}, None)
+
+
+def invalidate(*names):
+    """
+    Пометить записи устаревшими (значения остаются до пересчета); внутри
+    транзакции - сразу и повторно после ее фиксации.
+    """
+    _stamp(names)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _stamp(names))
+
+
+def invalidate_all():
+    """Пометить устаревшими все записи (после массовых изменений в обход сигналов)"""
+    invalidate(_ALL)
+
+
+def cache_stats():
+    """Счетчики процесса: попадания, промахи, устаревшие ответы, ожидания, пересчеты"""
+    with _counters_lock:
+        counters = dict(_counters)
+    requests = counters['hits'] + counters['misses']
+    counters['hit_ratio'] = round(counters['hits'] / requests, 3) if requests else None
+    return counters
@@ -0,0 +1,238 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from auditorium_app import rollups
+from auditorium_app.management.commands.generate_dataset import room_number
+from auditorium_app.management.commands.import_inventory import Command as ImportCommand
+from auditorium_app.models import Building, BuildingFloor, BuildingRollup, Department, Room
+
+
+SQLITE_DB = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+
+@override_settings(DATABASES=SQLITE_DB)
+class ImportInventoryCommandTests(TestCase):
+    def write_file(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def run_import(self, kind, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_inventory', kind, path, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_buildings_departments_and_rooms(self):
+        buildings = self.write_file('.csv', (
+            "name,address,floors_count,description\n"
+            "Корпус А,Москва,5,\n"
+            "Корпус Б,Москва,0,\n"
+        ))
+        out, err = self.run_import('buildings', buildings)
+        self.assertEqual(Building.objects.count(), 1)
+        self.assertIn("Запись 2", err)
+
+        departments = self.write_file('.ndjson', "\n".join(json.dumps(row) for row in [
+            {"name": "Кафедра", "department_type": "department", "parent": "Факультет"},
+            {"name": "Университет", "department_type": "university"},
+            {"name": "Факультет", "department_type": "faculty", "parent": "Университет"},
+            {"name": "Сирота", "department_type": "center", "parent": "Нет такого"},
+        ]))
+        out, err = self.run_import('departments', departments, batch_size=10)
+        self.assertEqual(Department.objects.count(), 3)
+        self.assertIn("Нет такого", err)
+        chair = Department.objects.get(name="Кафедра")
+        self.assertEqual(chair.get_full_path(), "Университет → Факультет → Кафедра")
+
+        rooms = self.write_file('.csv', (
+            "building,room_number,floor,location_in_building,width,length,ceiling_height,"
+            "purpose,room_type,department,description\n"
+            "Корпус А,Л-101,1,Крыло А,10,8,3,lecture,auditorium,Кафедра,\n"
+            "Корпус А,Л-102,9,Крыло А,10,8,3,lecture,auditorium,,\n"
+            "Корпус Б,Л-103,1,Крыло А,10,8,3,lecture,auditorium,,\n"
+            "Корпус А,Л-104,1,Крыло А,-1,8,3,lecture,auditorium,,\n"
+            "Корпус А,С-201,2,Крыло Б,6,5,2.8,seminar,auditorium,,\n"
+        ))
+        out, err = self.run_import('rooms', rooms, batch_size=2)
+        self.assertEqual(Room.objects.count(), 2)
+        self.assertEqual(len(err.strip().splitlines()), 3)
+        room = Room.objects.get(room_number="Л-101")
+        self.assertEqual(room.department, chair)
+        self.assertAlmostEqual(room.get_area(), 80.0)
+        self.assertIn("загружено 2, ошибок 3", out)
+
+    def test_reimported_building_gets_new_etag(self):
+        building = Building.objects.create(name="Корпус А", address="Москва", floors_count=5)
+        url = reverse('auditorium_app:api_building_statistics', args=[building.pk])
+        etag = self.client.get(url)['ETag']
+        self.run_import('buildings', self.write_file('.csv', (
+            "name,address,floors_count,description\n"
+            "Корпус А,Казань,7,\n"
+        )))
+        building.refresh_from_db()
+        self.assertEqual((building.address, building.floors_count), ("Казань", 7))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_import_departments_updates_existing_rows(self):
+        university = Department.objects.create(name="Университет", department_type="university")
+        faculty = Department.objects.create(name="Факультет", department_type="faculty", parent=university)
+        departments = self.write_file('.ndjson', "\n".join(json.dumps(row) for row in [
+            {"name": "Институт", "department_type": "institute", "parent": "Университет"},
+            {"name": "Факультет", "department_type": "faculty", "parent": "Институт",
+             "description": "Перенесен"},
+            {"name": "Университет", "department_type": "university", "parent": "Факультет"},
+        ]))
+        out, err = self.run_import('departments', departments)
+        faculty.refresh_from_db()
+        self.assertEqual(faculty.description, "Перенесен")
+        self.assertEqual(faculty.get_full_path(), "Университет → Институт → Факультет")
+        self.assertIn("Запись 3: Подразделение не может быть вложено само в себя", err)
+        self.assertIsNone(Department.objects.get(pk=university.pk).parent_id)
+        self.assertEqual(Department.objects.count(), 3)
+
+    def test_database_error_fails_only_its_row(self):
+        command = ImportCommand(stdout=StringIO(), stderr=StringIO())
+        command.loaded = command.failed = 0
+
+        def save(items):
+            for _, name in items:
+                Building.objects.create(name=name, address="Москва", floors_count=1)
+                if name == "Корпус Б":
+                    raise DatabaseError("сбой")
+        saved = command._save_batch([(1, "Корпус А"), (2, "Корпус Б"), (3, "Корпус В")], save)
+        self.assertEqual([number for number, _ in saved], [1, 3])
+        self.assertEqual((command.loaded, command.failed), (2, 1))
+        self.assertEqual(
+            list(Building.objects.order_by('name').values_list('name', flat=True)),
+            ["Корпус А", "Корпус В"],
+        )
+
+    def test_import_rooms_updates_existing_rows(self):
+        building = Building.objects.create(name="Корпус А", address="Москва", floors_count=5)
+        Room.objects.create(
+            building=building, room_number="Л-101", floor=1, location_in_building="Крыло А",
+            width=10, length=8, ceiling_height=3, purpose="lecture", room_type="auditorium",
+        )
+        rooms = self.write_file('.ndjson', json.dumps({
+            "building": "Корпус А", "room_number": "Л-101", "floor": 2,
+            "location_in_building": "Крыло Б", "width": 5, "length": 4, "ceiling_height": 3,
+            "purpose": "office", "room_type": "office",
+        }))
+        self.run_import('rooms', rooms)
+        room = Room.objects.get()
+        self.assertEqual(room.floor, 2)
+        self.assertEqual(room.purpose, "office")
+        self.assertAlmostEqual(room.get_area(), 20.0)
+
+
+@override_settings(DATABASES=SQLITE_DB)
+class GenerateDatasetCommandTests(TestCase):
+    def generate(self, **options):
+        call_command(
+            'generate_dataset', scale=0.02, rooms_per_building=50, department_levels=10,
+            stdout=StringIO(), **options
+        )
+        return list(Room.objects.order_by('building__name', 'room_number').values_list(
+            'building__name', 'room_number', 'floor', 'width', 'length', 'ceiling_height',
+            'purpose', 'department__name', 'area',
+        ))
+
+    def test_generates_consistent_dataset(self):
+        rooms = self.generate(seed=7)
+        self.assertEqual(Building.objects.count(), 2)
+        self.assertEqual(len(rooms), 100)
+        self.assertEqual(Department.objects.count(), 10)
+        self.assertEqual(Department.objects.order_by('-depth').first().get_depth(), 9)
+        for building in Building.objects.all():
+            self.assertEqual(
+                list(building.floors.values_list('floor_number', flat=True)),
+                list(range(1, building.floors_count + 1)),
+            )
+        self.assertFalse(Room.objects.filter(floor__gt=12).exists())
+        room = Room.objects.first()
+        self.assertEqual(room.area, room.width * room.length)
+        self.assertEqual(
+            room.ceiling_height,
+            BuildingFloor.objects.get(building=room.building, floor_number=room.floor).ceiling_height,
+        )
+        # Итоги пересчитаны после загрузки в обход сигналов
+        self.assertEqual(rollups.drift(), [])
+        self.assertTrue(BuildingRollup.objects.exists())
+
+    def test_room_numbers_unique_across_floors(self):
+        self.assertNotEqual(room_number(1, 1001), room_number(11, 1))
+        self.assertEqual(room_number(2, 7), "2-007")
+
+    def test_same_seed_gives_same_data(self):
+        first = self.generate(seed=7)
+        with self.assertRaises(CommandError):
+            self.generate(seed=7)
+        self.assertEqual(self.generate(seed=7, clear=True), first)
+        self.assertNotEqual(self.generate(seed=8, clear=True), first)
+
+    def test_seeded_runs_produce_identical_rows(self):
+        def rows():
+            # Все столбцы, включая первичные и внешние ключи, кроме отметок времени
+            return [
+                list(model.objects.order_by('pk').values_list(*[
+                    field.attname for field in model._meta.concrete_fields
+                    if field.attname not in ('created_at', 'updated_at', 'search_vector')
+                ]))
+                for model in (Department, Building, BuildingFloor, Room)
+            ]
+        self.generate(seed=7)
+        self.generate(seed=8, clear=True)
+        first = rows()
+        self.generate(seed=8, clear=True)
+        self.assertEqual(rows(), first)
+
+
+@override_settings(DATABASES=SQLITE_DB)
+class RebuildRollupsCommandTests(TestCase):
+    def test_check_reports_drift_and_rebuild_fixes_it(self):
+        building = Building.objects.create(name="Корпус А", address="Москва", floors_count=3)
+        room = Room.objects.create(
+            building=building, room_number="101", floor=1, location_in_building="Крыло А",
+            width=5, length=6, ceiling_height=3, purpose="office", room_type="office",
+        )
+        call_command('rebuild_rollups', check=True, stdout=StringIO())
+
+        # Изменение в обход сигналов
+        Room.objects.filter(pk=room.pk).update(floor=2)
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "Расхождений в итогах: 2"):
+            call_command('rebuild_rollups', check=True, stdout=out)
+        self.assertIn("FloorRollup", out.getvalue())
+
+        out = StringIO()
+        call_command('rebuild_rollups', stdout=out)
+        self.assertIn("исправлено расхождений: 2", out.getvalue())
+        call_command('rebuild_rollups', check=True, stdout=StringIO())
+
+
+@override_settings(DATABASES=SQLITE_DB)
+class BenchmarkViewsCommandTests(TestCase):
+    def test_all_routes_within_query_budgets(self):
+        out = StringIO()
+        call_command(
+            'benchmark_views', use_existing_db=True, scale=0.02, rooms_per_building=30,
+            iterations=1, skip_latency_budgets=True, stdout=out,
+        )
+        self.assertIn("department_detail", out.getvalue())
+        self.assertIn("Все маршруты в пределах бюджетов", out.getvalue())
@@ -0,0 +1,99 @@
+import threading
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from auditorium_app.db_pool import ConnectionPool, PoolTimeout
+
+
+SQLITE_DB = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def make_pool(self, **kwargs):
+        self.opened = []
+
+        def connect():
+            conn = FakeConnection(len(self.opened) + 1)
+            self.opened.append(conn)
+            return conn
+        return ConnectionPool(connect, check=lambda conn: not conn.closed, **kwargs)
+
+    def test_connections_are_reused(self):
+        pool = self.make_pool(size=2)
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        self.assertEqual(len(self.opened), 1)
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['checkouts'], stats['in_use']), (1, 2, 1))
+
+    def test_timeout_when_exhausted(self):
+        pool = self.make_pool(size=1, timeout=0.05)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_released_connection(self):
+        pool = self.make_pool(size=1, timeout=5)
+        conn = pool.acquire()
+        timer = threading.Timer(0.05, pool.release, [conn])
+        timer.start()
+        self.assertIs(pool.acquire(), conn)
+        timer.join()
+        self.assertEqual(pool.stats()['waits'], 1)
+
+    def test_broken_connections_are_replaced(self):
+        pool = self.make_pool(size=1)
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.closed = True
+        replacement = pool.acquire()
+        self.assertIsNot(replacement, conn)
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+        pool = ConnectionPool(self.make_pool()._connect, reset=lambda conn: False)
+        pool.release(pool.acquire())
+        self.assertEqual(pool.stats()['idle'], 0)
+
+    def test_failed_connect_frees_slot(self):
+        def connect():
+            raise OSError("нет соединения")
+        pool = ConnectionPool(connect, size=1, timeout=0.05)
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                pool.acquire()
+        self.assertEqual(pool.stats()['in_use'], 0)
+
+
+@override_settings(DATABASES=SQLITE_DB)
+class DbConnectionsEndpointTests(TestCase):
+    def test_reports_connection_settings(self):
+        url = reverse('auditorium_app:api_db_connections')
+        # Только для персонала: анонимный запрос уходит на вход в админку
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        data = self.client.get(url).json()
+        self.assertIn('conn_max_age', data['databases']['default'])
+        self.assertEqual(data['pools'], {})
+
+    @override_settings(DIAGNOSTICS_API=True)
+    def test_diagnostics_setting_opens_endpoint(self):
+        response = self.client.get(reverse('auditorium_app:api_db_connections'))
+        self.assertEqual(response.status_code, 200)
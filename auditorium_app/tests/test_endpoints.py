@@ -1,7 +1,18 @@
-from django.test import TestCase, Client, override_settings
+import base64
+import json
+
+from asgiref.sync import sync_to_async
+
+from django.core.cache import cache, caches
+from django.db import connection
+from django.http import Http404
+from django.test import AsyncRequestFactory, TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from auditorium_app import async_views, views
 from auditorium_app.models import Building, Department, Room
+from auditorium_app.pagination import CursorPaginator, encode_cursor
 
 
 SQLITE_DB = {
@@ -34,6 +45,7 @@ INMEM_TEMPLATES = [
                         'auditorium_app/room_form.html': '',
                         'auditorium_app/building_confirm_delete.html': '',
                         'auditorium_app/room_confirm_delete.html': '',
+                        'auditorium_app/search.html': '',
                     },
                 )
             ]
@@ -90,6 +102,11 @@ class EndpointsTests(TestCase):
 
         cls.client = Client()
 
+    def setUp(self):
+        # Кеши (статистика, счетчики фильтров, автодополнение) живут дольше транзакции теста
+        cache.clear()
+        caches['autocomplete'].clear()
+
     def test_index_page(self):
         resp = self.client.get(reverse('auditorium_app:index'))
         self.assertEqual(resp.status_code, 200)
@@ -99,6 +116,26 @@ class EndpointsTests(TestCase):
         self.assertIn('total_departments', resp.context)
         self.assertGreaterEqual(resp.context['total_rooms'], 2)
 
+    def test_index_aggregates_match_model_methods(self):
+        resp = self.client.get(reverse('auditorium_app:index'))
+        rooms = list(Room.objects.all())
+        self.assertAlmostEqual(resp.context['total_area'], sum(r.get_area() for r in rooms))
+        self.assertAlmostEqual(resp.context['total_volume'], sum(r.get_volume() for r in rooms))
+        stat = resp.context['buildings_stats'][0]
+        self.assertEqual(stat['rooms_count'], 2)
+        self.assertAlmostEqual(stat['area'], self.room1.get_area() + self.room2.get_area())
+        self.assertEqual(resp.context['room_types_stats']['Аудитория']['count'], 2)
+
+    def test_index_query_count_does_not_depend_on_buildings(self):
+        url = reverse('auditorium_app:index')
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url)
+        for i in range(5):
+            Building.objects.create(name=f"Корпус {i}", address="Москва", floors_count=3)
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(url)
+        self.assertEqual(len(before), len(after))
+
     def test_buildings_list_page(self):
         resp = self.client.get(reverse('auditorium_app:buildings_list'))
         self.assertEqual(resp.status_code, 200)
@@ -106,6 +143,21 @@ class EndpointsTests(TestCase):
         buildings = list(resp.context['buildings'])
         self.assertTrue(any(b.name == "Корпус А" for b in buildings))
 
+    def test_buildings_list_annotated_statistics(self):
+        for i in range(3):
+            Building.objects.create(name=f"Корпус Б{i}", address="Москва", floors_count=2)
+        with self.assertNumQueries(2):
+            resp = self.client.get(reverse('auditorium_app:buildings_list'))
+        # Повторно - из кеша статистики корпусов
+        with self.assertNumQueries(0):
+            self.client.get(reverse('auditorium_app:buildings_list'))
+        building = next(b for b in resp.context['buildings'] if b.id == self.building.id)
+        self.assertEqual(building.rooms_count, 2)
+        self.assertAlmostEqual(building.total_area, self.building.get_total_area())
+        self.assertAlmostEqual(building.total_volume, self.room1.get_volume() + self.room2.get_volume())
+        self.assertEqual(resp.context['total_rooms_count'], 2)
+        self.assertAlmostEqual(resp.context['total_area_sum'], self.building.get_total_area())
+
     def test_building_detail_page(self):
         url = reverse('auditorium_app:building_detail', args=[self.building.id])
         resp = self.client.get(url)
@@ -115,6 +167,26 @@ class EndpointsTests(TestCase):
         self.assertIn(1, stats)
         self.assertIn(2, stats)
 
+    def test_building_detail_grouped_statistics(self):
+        url = reverse('auditorium_app:building_detail', args=[self.building.id])
+        with CaptureQueriesContext(connection) as before:
+            resp = self.client.get(url)
+        self.assertEqual(resp.context['floors_stats'][1]['rooms'], 1)
+        self.assertAlmostEqual(resp.context['floors_stats'][2]['area'], self.room2.get_area())
+        self.assertAlmostEqual(
+            resp.context['total_volume'], self.room1.get_volume() + self.room2.get_volume()
+        )
+        dept_stat = resp.context['departments_stats'][0]
+        self.assertEqual(dept_stat['department'], self.dept)
+        self.assertEqual(dept_stat['rooms_count'], 1)
+        self.assertAlmostEqual(dept_stat['area'], self.room1.get_area())
+
+        Room.objects.filter(pk=self.room2.pk).update(department=self.faculty)
+        with CaptureQueriesContext(connection) as after:
+            resp = self.client.get(url)
+        self.assertEqual(len(resp.context['departments_stats']), 2)
+        self.assertEqual(len(before), len(after))
+
     def test_rooms_list_filters(self):
         url = reverse('auditorium_app:rooms_list')
         # Без фильтров
@@ -134,6 +206,129 @@ class EndpointsTests(TestCase):
         self.assertEqual(resp2.status_code, 200)
         self.assertEqual(resp2.context['rooms'].paginator.count, 1)
 
+    def test_rooms_list_facet_counts(self):
+        url = reverse('auditorium_app:rooms_list')
+        params = {'building': self.building.id, 'purpose': 'lecture'}
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url, params)
+        # Счетчики при остальных фильтрах: другое назначение в том же корпусе тоже видно
+        purposes = {value: count for value, _, count in resp.context['purpose_choices']}
+        self.assertEqual(purposes['lecture'], 1)
+        self.assertEqual(purposes['seminar'], 1)
+        self.assertEqual(purposes['office'], 0)
+        room_types = {value: count for value, _, count in resp.context['room_type_choices']}
+        self.assertEqual(room_types['auditorium'], 1)
+        self.assertEqual([b.facet_count for b in resp.context['buildings']], [1])
+        self.assertEqual(resp.context['floor_counts'], [(1, 1)])
+
+        # Повтор с теми же фильтрами - счетчики из кеша
+        with CaptureQueriesContext(connection) as cached:
+            self.client.get(url, params)
+        self.assertEqual(len(cached), len(queries) - 1)
+
+    def test_rooms_list_cursor_pagination(self):
+        building = Building.objects.create(name="Корпус Б", address="Москва", floors_count=3)
+        for i in range(30):
+            Room.objects.create(
+                building=building, room_number=f"К-{i:02d}", floor=i % 3 + 1,
+                location_in_building="Крыло", width=4.0, length=5.0, ceiling_height=3.0,
+                purpose="office", room_type="office",
+            )
+        url = reverse('auditorium_app:rooms_list')
+        expected = list(
+            Room.objects.order_by('building_id', 'floor', 'room_number').values_list('id', flat=True)
+        )
+
+        seen, pages, cursor = [], [], ''
+        while True:
+            resp = self.client.get(url, {'cursor': cursor})
+            self.assertTrue(resp.context['cursor_mode'])
+            page = resp.context['rooms']
+            pages.append(page)
+            seen.extend(room.id for room in page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(pages[0].paginator.count, 32)
+
+        resp = self.client.get(url, {'cursor': pages[1].previous_cursor})
+        self.assertEqual([room.id for room in resp.context['rooms']], expected[:25])
+
+        # Поврежденный токен - первая страница
+        resp = self.client.get(url, {'cursor': 'garbage'})
+        self.assertEqual([room.id for room in resp.context['rooms']], expected[:25])
+
+    def test_cursor_pages_with_mixed_directions(self):
+        building = Building.objects.create(name="Корпус Б", address="Москва", floors_count=3)
+        for i in range(12):
+            Room.objects.create(
+                building=building, room_number=f"К-{i:02d}", floor=i % 3 + 1,
+                location_in_building="Крыло", width=4.0, length=5.0, ceiling_height=3.0,
+                purpose="office", room_type="office",
+            )
+        # Ключ в разных направлениях сравнивается цепочкой OR, а не значением строки
+        ordering = ('-floor', 'room_number')
+        expected = list(Room.objects.order_by(*ordering).values_list('id', flat=True))
+        paginator = CursorPaginator(Room.objects.values('id', 'floor', 'room_number'), ordering, 5)
+        seen, page = [], paginator.get_page('')
+        while True:
+            seen.extend(row['id'] for row in page)
+            if not page.has_next():
+                break
+            page = paginator.get_page(page.next_cursor)
+        self.assertEqual(seen, expected)
+        previous = paginator.get_page(page.previous_cursor)
+        self.assertEqual([row['id'] for row in previous], expected[5:10])
+
+    def test_malformed_cursor_returns_first_page(self):
+        tokens = [
+            'garbage',
+            base64.urlsafe_b64encode(b'null').decode(),
+            base64.urlsafe_b64encode(b'[1, 2]').decode(),
+            encode_cursor(['x', 1, 'Л-101'], 'next'),
+            encode_cursor([[1], {}, None], 'next'),
+            encode_cursor([1, 1], 'next'),
+            encode_cursor([1, 1, 'Л-101'], 'sideways'),
+        ]
+        for token in tokens:
+            resp = self.client.get(reverse('auditorium_app:rooms_list'), {'cursor': token})
+            self.assertEqual(resp.status_code, 200, token)
+            self.assertEqual(len(resp.context['rooms']), 2, token)
+            resp = self.client.get(reverse('auditorium_app:api_rooms'), {'cursor': token})
+            self.assertEqual(resp.status_code, 200, token)
+            self.assertEqual(len(resp.json()['results']), 2, token)
+
+    def test_building_detail_cursor_pagination(self):
+        url = reverse('auditorium_app:building_detail', args=[self.building.id])
+        resp = self.client.get(url, {'cursor': ''})
+        self.assertEqual([room.id for room in resp.context['rooms']], [self.room1.id, self.room2.id])
+        self.assertFalse(resp.context['rooms'].has_other_pages())
+
+    def test_rooms_export_csv(self):
+        resp = self.client.get(reverse('auditorium_app:rooms_export'), {'purpose': 'lecture'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('id,building,room_number'))
+        self.assertIn('Л-101', lines[1])
+        self.assertIn('Кафедра', lines[1])
+
+    def test_rooms_export_ndjson(self):
+        resp = self.client.get(reverse('auditorium_app:rooms_export'), {'format': 'ndjson'})
+        self.assertEqual(resp.status_code, 200)
+        rows = [json.loads(line) for line in b''.join(resp.streaming_content).decode().splitlines()]
+        self.assertEqual([row['room_number'] for row in rows], ['Л-101', 'С-202'])
+        self.assertAlmostEqual(float(rows[0]['area']), self.room1.get_area())
+        self.assertEqual(rows[0]['capacity_estimate'], self.room1.get_capacity_estimate())
+
+        resp = self.client.get(reverse('auditorium_app:rooms_export'), {'format': 'xml'})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.get(reverse('auditorium_app:rooms_export'), {'building': 'abc'})
+        self.assertEqual(resp.status_code, 400)
+
     def test_room_detail_page(self):
         url = reverse('auditorium_app:room_detail', args=[self.room1.id])
         resp = self.client.get(url)
@@ -146,6 +341,20 @@ class EndpointsTests(TestCase):
         self.assertIn('departments_tree', resp.context)
         self.assertGreaterEqual(len(resp.context['departments_tree']), 1)
 
+    def test_departments_list_tree_single_query(self):
+        Department.objects.create(name="Лаборатория", parent=self.dept, department_type="laboratory")
+        Department.objects.create(name="Институт", department_type="institute")
+        with self.assertNumQueries(1):
+            resp = self.client.get(reverse('auditorium_app:departments_list'))
+        tree = resp.context['departments_tree']
+        self.assertEqual([node['department'].name for node in tree], ["Институт", "Университет"])
+        faculty = tree[1]['children'][0]
+        self.assertEqual(faculty['level'], 1)
+        chair = faculty['children'][0]
+        self.assertEqual(chair['department'].rooms_count, 1)
+        self.assertEqual(chair['children'][0]['department'].name, "Лаборатория")
+        self.assertEqual(chair['children'][0]['level'], 3)
+
     def test_department_detail_page(self):
         url = reverse('auditorium_app:department_detail', args=[self.dept.id])
         resp = self.client.get(url)
@@ -160,6 +369,51 @@ class EndpointsTests(TestCase):
         self.assertIn('hierarchy', resp.context)
         self.assertEqual(resp.context['building'].id, self.building.id)
 
+    def test_search_page_and_api(self):
+        resp = self.client.get(reverse('auditorium_app:search'), {'q': 'Л-101'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([room.id for room in resp.context['rooms']], [self.room1.id])
+
+        url = reverse('auditorium_app:api_search')
+        data = self.client.get(url, {'q': 'Корпус', 'type': 'rooms,buildings'}).json()
+        self.assertEqual([row['id'] for row in data['rooms']], [self.room1.id, self.room2.id])
+        self.assertEqual(data['buildings'][0]['name'], 'Корпус А')
+        self.assertNotIn('departments', data)
+
+        data = self.client.get(url, {'q': 'Кафедр', 'limit': 1}).json()
+        self.assertEqual([row['name'] for row in data['departments']], ['Кафедра'])
+        for params in ({}, {'q': 'x', 'type': 'secret'}, {'q': 'x', 'limit': 1000}):
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+
+    def test_api_autocomplete(self):
+        url = reverse('auditorium_app:api_autocomplete')
+        data = self.client.get(url, {'q': 'Л-1'}).json()
+        self.assertEqual(data['results'], [{
+            'type': 'rooms', 'id': self.room1.id, 'label': 'Л-101',
+            'building_id': self.building.id, 'building': 'Корпус А', 'score': 1.0,
+        }])
+
+        params = {'q': 'К', 'type': 'buildings,departments', 'limit': 5}
+        data = self.client.get(url, params).json()
+        self.assertEqual([row['label'] for row in data['results']], ['Кафедра', 'Корпус А'])
+        self.assertEqual(data['results'][0]['building'], None)
+        # Повторный префикс - из кеша, без запросов к БД
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url, params).json(), data)
+        self.assertEqual(len(queries), 0)
+        # Кеш подсказок - отдельный, в памяти процесса, а не общий кеш по умолчанию
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, params)
+        self.assertEqual(len(queries), 0)
+        caches['autocomplete'].clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, params)
+        self.assertEqual(len(queries), 1)
+
+        for params in ({}, {'q': 'x', 'type': 'secret'}, {'q': 'x', 'limit': 1000}):
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+
     def test_api_room_calculations(self):
         url = reverse('auditorium_app:api_room_calculations', args=[self.room1.id])
         resp = self.client.get(url)
@@ -180,4 +434,225 @@ class EndpointsTests(TestCase):
         self.assertIn('room_types', data)
         self.assertGreaterEqual(data['total_rooms'], 2)
 
+    def test_api_rooms_fields_filters_and_pagination(self):
+        url = reverse('auditorium_app:api_rooms')
+        resp = self.client.get(url, {'fields': 'room_number,area', 'area_min': '50'})
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data['results'], [{'room_number': 'Л-101', 'area': 80.0}])
+        self.assertIsNone(data['next'])
+
+        resp = self.client.get(url, {'fields': 'id', 'floor_min': 2, 'floor_max': 2})
+        self.assertEqual(resp.json()['results'], [{'id': self.room2.id}])
+
+        resp = self.client.get(url, {'fields': 'room_number', 'limit': 1, 'count': 1})
+        data = resp.json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['results'], [{'room_number': 'Л-101'}])
+        resp = self.client.get(url, {'fields': 'room_number', 'limit': 1, 'cursor': data['next']})
+        self.assertEqual(resp.json()['results'], [{'room_number': 'С-202'}])
+
+    def test_api_rooms_invalid_parameters(self):
+        url = reverse('auditorium_app:api_rooms')
+        for params in ({'fields': 'secret'}, {'floor_min': 'x'}, {'limit': 0}, {'building': 'x'},
+                       {'area_min': 'nan'}, {'area_max': 'inf'}, {'area_min': '-Infinity'}):
+            resp = self.client.get(url, params)
+            self.assertEqual(resp.status_code, 400, params)
+            self.assertIn('error', resp.json())
+
+    def test_api_buildings_and_departments(self):
+        resp = self.client.get(reverse('auditorium_app:api_buildings'), {'fields': 'id,name'})
+        self.assertEqual(resp.json()['results'], [{'id': self.building.id, 'name': 'Корпус А'}])
+
+        resp = self.client.get(
+            reverse('auditorium_app:api_departments'), {'parent': self.faculty.id, 'fields': 'name,depth'}
+        )
+        self.assertEqual(resp.json()['results'], [{'name': 'Кафедра', 'depth': 2}])
+
+    def test_conditional_get_building_statistics(self):
+        url = reverse('auditorium_app:api_building_statistics', args=[self.building.id])
+        resp = self.client.get(url)
+        etag = resp['ETag']
+        self.assertTrue(resp.has_header('Last-Modified'))
+        with self.assertNumQueries(1):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        # Переименование подразделения и удаление помещения сбрасывают валидатор
+        self.dept.name = "Кафедра 2"
+        self.dept.save()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        etag = resp['ETag']
+        Room.objects.get(pk=self.room2.pk).delete()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['total_rooms'], 1)
+
+    def test_conditional_get_building_after_department_delete(self):
+        lab = Department.objects.create(name="Лаборатория", department_type="laboratory")
+        room = Room.objects.get(pk=self.room2.pk)
+        room.department = lab
+        room.save()
+        # Позже измененное подразделение корпуса остается - максимум updated_at тот же
+        self.dept.save()
+        url = reverse('auditorium_app:building_detail', args=[self.building.id])
+        etag = self.client.get(url)['ETag']
+        lab.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_conditional_get_rooms(self):
+        detail_url = reverse('auditorium_app:room_detail', args=[self.room1.id])
+        calc_url = reverse('auditorium_app:api_room_calculations', args=[self.room1.id])
+        detail_etag = self.client.get(detail_url)['ETag']
+        calc_etag = self.client.get(calc_url)['ETag']
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code, 304)
+        self.assertEqual(self.client.get(calc_url, HTTP_IF_NONE_MATCH=calc_etag).status_code, 304)
+
+        # Новое похожее помещение меняет страницу помещения, но не его расчеты
+        other = Building.objects.create(name="Корпус Б", address="Москва", floors_count=3)
+        room = Room.objects.create(
+            building=other, room_number="Л-102", floor=1, location_in_building="Крыло",
+            width=5, length=5, ceiling_height=3, purpose="lecture", room_type="auditorium",
+        )
+        room.building = self.building
+        room.save()
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code, 200)
+        self.assertEqual(self.client.get(calc_url, HTTP_IF_NONE_MATCH=calc_etag).status_code, 304)
+
+        self.assertEqual(self.client.get(reverse('auditorium_app:room_detail', args=[999])).status_code, 404)
+
+    def test_api_rooms_calculations_batch(self):
+        url = reverse('auditorium_app:api_rooms_calculations')
+        with self.assertNumQueries(1):
+            resp = self.client.get(url, {'ids': f'{self.room2.id},{self.room1.id}'})
+        self.assertEqual(resp.status_code, 200)
+        results = resp.json()['results']
+        self.assertEqual([row['id'] for row in results], [self.room2.id, self.room1.id])
+        self.assertAlmostEqual(results[1]['volume'], self.room1.get_volume())
+        self.assertEqual(results[1]['capacity_estimate'], self.room1.get_capacity_estimate())
+
+        resp = self.client.get(url, {'building': self.building.id, 'floor': 2})
+        self.assertEqual([row['id'] for row in resp.json()['results']], [self.room2.id])
+
+        resp = self.client.get(url, {'ids': f'{self.room1.id},999'})
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(resp.json()['missing_ids'], [999])
+
+        too_many = ','.join(str(i) for i in range(1, 502))
+        self.assertEqual(self.client.get(url, {'ids': too_many}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_api_buildings_statistics_single_query(self):
+        empty = Building.objects.create(name="Корпус Б", address="Москва", floors_count=3)
+        single = self.client.get(
+            reverse('auditorium_app:api_building_statistics', args=[self.building.id])
+        ).json()
+        url = reverse('auditorium_app:api_buildings_statistics')
+        with self.assertNumQueries(1):
+            resp = self.client.get(url, {'ids': f'{self.building.id},{empty.id}'})
+        results = resp.json()['results']
+        self.assertEqual(results[0], {'id': self.building.id, **single})
+        self.assertEqual(single['room_types']['Аудитория']['count'], 2)
+        self.assertEqual(results[1]['total_rooms'], 0)
+        self.assertEqual(results[1]['room_types'], {})
+
+        self.assertEqual(len(self.client.get(url).json()['results']), 2)
+        resp = self.client.get(url, {'ids': '999'})
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(resp.json()['missing_ids'], [999])
+
+
+
+@override_settings(DATABASES=SQLITE_DB)
+class AsyncApiTests(TestCase):
+    """Async-версии API отвечают так же, как синхронные"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.university = Department.objects.create(name="Университет", department_type="university")
+        cls.building = Building.objects.create(name="Корпус А", address="Москва", floors_count=5)
+        cls.room1 = Room.objects.create(
+            building=cls.building, room_number="Л-101", floor=1, location_in_building="Крыло А",
+            width=10, length=8, ceiling_height=3, purpose="lecture", room_type="auditorium",
+            department=cls.university,
+        )
+        cls.room2 = Room.objects.create(
+            building=cls.building, room_number="С-202", floor=2, location_in_building="Крыло Б",
+            width=6, length=5, ceiling_height=2.8, purpose="seminar", room_type="auditorium",
+        )
+
+    def setUp(self):
+        cache.clear()
+        caches['autocomplete'].clear()
+        self.factory = AsyncRequestFactory()
+
+    def sync_json(self, name, args=None, params=None):
+        return self.client.get(reverse(f'auditorium_app:{name}', args=args), params).json()
+
+    async def test_rooms_export_streams_async_iterator(self):
+        request = self.factory.get('/', {'format': 'ndjson'})
+        response = await sync_to_async(views.rooms_export)(request)
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response])
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([row['room_number'] for row in rows], ['Л-101', 'С-202'])
+
+    async def test_lists_match_sync_views(self):
+        for name, view, params in (
+            ('api_rooms', async_views.api_rooms, {'limit': 1, 'count': 1}),
+            ('api_buildings', async_views.api_buildings, {'fields': 'id,name'}),
+            ('api_departments', async_views.api_departments, {}),
+            ('api_rooms_calculations', async_views.api_rooms_calculations, {'building': self.building.id}),
+            ('api_buildings_statistics', async_views.api_buildings_statistics, {}),
+            ('api_search', async_views.api_search, {'q': 'Л-101'}),
+            ('api_autocomplete', async_views.api_autocomplete, {'q': 'Л-1'}),
+        ):
+            response = await view(self.factory.get('/', params))
+            self.assertEqual(response.status_code, 200, name)
+            expected = await sync_to_async(self.sync_json)(name, params=params)
+            self.assertEqual(json.loads(response.content), expected, name)
+
+        response = await async_views.api_rooms(self.factory.get('/', {'limit': 1}))
+        cursor = json.loads(response.content)['next']
+        response = await async_views.api_rooms(self.factory.get('/', {'limit': 1, 'cursor': cursor}))
+        self.assertEqual(json.loads(response.content)['results'][0]['id'], self.room2.id)
+
+    async def test_errors(self):
+        response = await async_views.api_rooms(self.factory.get('/', {'fields': 'secret'}))
+        self.assertEqual(response.status_code, 400)
+        response = await async_views.api_rooms_calculations(self.factory.get('/', {'ids': '999'}))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.content)['missing_ids'], [999])
+        with self.assertRaises(Http404):
+            await async_views.api_building_statistics(self.factory.get('/'), building_id=999)
+        response = await async_views.api_search(self.factory.get('/', {'type': 'rooms'}))
+        self.assertEqual(response.status_code, 400)
+        with self.assertRaises(Http404):
+            await async_views.api_department_statistics(self.factory.get('/'), department_id=999)
+
+    async def test_department_statistics(self):
+        response = await async_views.api_department_statistics(
+            self.factory.get('/'), department_id=self.university.id
+        )
+        expected = await sync_to_async(self.sync_json)(
+            'api_department_statistics', args=[self.university.id]
+        )
+        self.assertEqual(json.loads(response.content), expected)
+
+    async def test_detail_views_support_conditional_get(self):
+        response = await async_views.api_building_statistics(
+            self.factory.get('/'), building_id=self.building.id
+        )
+        expected = await sync_to_async(self.sync_json)(
+            'api_building_statistics', args=[self.building.id]
+        )
+        self.assertEqual(json.loads(response.content), expected)
+        response = await async_views.api_building_statistics(
+            self.factory.get('/', headers={'If-None-Match': response['ETag']}), building_id=self.building.id
+        )
+        self.assertEqual(response.status_code, 304)
 
+        response = await async_views.api_room_calculations(self.factory.get('/'), room_id=self.room1.id)
+        self.assertEqual(json.loads(response.content), {'area': 80.0, 'volume': 240.0, 'capacity_estimate': 40})
+        self.assertTrue(response.has_header('Last-Modified'))
@@ -0,0 +1,72 @@
+import json
+import re
+
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from auditorium_app.middleware import RequestProfilingMiddleware, fingerprint
+from auditorium_app.models import Building, Room
+
+
+SQLITE_DB = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+
+def server_timing(response):
+    return {
+        match.group(1): (float(match.group(2)), match.group(3))
+        for match in re.finditer(r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', response['Server-Timing'])
+    }
+
+
+@override_settings(DATABASES=SQLITE_DB, PROFILING_DUPLICATE_QUERY_THRESHOLD=3)
+class RequestProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.building = Building.objects.create(name="Корпус А", address="Москва", floors_count=5)
+        Room.objects.create(
+            building=cls.building, room_number="Л-101", floor=1, location_in_building="Крыло А",
+            width=10, length=8, ceiling_height=3, purpose="lecture", room_type="auditorium",
+        )
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('auditorium_app:api_buildings_statistics'))
+        timing = server_timing(response)
+        self.assertEqual(set(timing), {'db', 'tpl', 'app', 'total'})
+        self.assertEqual(timing['db'][1], "1 queries")
+        self.assertGreaterEqual(timing['total'][0], timing['db'][0])
+
+    def test_duplicate_queries_are_logged(self):
+        def view(request):
+            for pk in range(5):
+                Building.objects.filter(pk__in=[pk, pk + 1]).exists()
+            Room.objects.count()
+            return HttpResponse()
+
+        middleware = RequestProfilingMiddleware(view)
+        with self.assertLogs('auditorium_app.profiling', 'WARNING') as logs:
+            response = middleware(RequestFactory().get('/rooms/'))
+        self.assertEqual(server_timing(response)['db'][1], "6 queries")
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], '/rooms/')
+        self.assertEqual([item['count'] for item in record['duplicate_queries']], [5])
+
+    async def test_async_requests(self):
+        async def view(request):
+            await Room.objects.acount()
+            return HttpResponse()
+
+        middleware = RequestProfilingMiddleware(view)
+        response = await middleware(AsyncRequestFactory().get('/'))
+        self.assertEqual(server_timing(response)['db'][1], "1 queries")
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE a = 'x' AND b IN (%s, %s, %s) LIMIT 21"),
+            "SELECT * FROM t WHERE a = ? AND b IN (%s, ...) LIMIT ?",
+        )
@@ -0,0 +1,233 @@
+from decimal import Decimal
+from io import StringIO
+from itertools import combinations
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from auditorium_app.models import Building, Department, Room
+from auditorium_app.pagination import encode_cursor
+
+
+SQLITE_DB = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+
+@override_settings(DATABASES=SQLITE_DB)
+class RoomStoredDimensionsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.building = Building.objects.create(name="Корпус А", address="Москва", floors_count=5)
+        cls.room = Room.objects.create(
+            building=cls.building,
+            room_number="Л-101",
+            floor=1,
+            location_in_building="Крыло А",
+            width=Decimal('10.50'),
+            length=Decimal('8.00'),
+            ceiling_height=Decimal('3.20'),
+            purpose="lecture",
+            room_type="auditorium",
+        )
+
+    def test_dimensions_are_stored_on_save(self):
+        room = Room.objects.get(pk=self.room.pk)
+        self.assertEqual(room.area, Decimal('84'))
+        self.assertEqual(room.volume, Decimal('268.8'))
+        self.assertEqual(room.capacity_estimate, 42)
+        self.assertAlmostEqual(room.get_area(), 84.0)
+        self.assertAlmostEqual(room.get_volume(), 268.8)
+
+    def test_unsaved_dimension_change(self):
+        room = Room.objects.get(pk=self.room.pk)
+        room.width = Decimal('5.00')
+        self.assertAlmostEqual(room.get_area(), 40.0)
+        self.assertAlmostEqual(room.get_volume(), 128.0)
+        self.assertEqual(room.get_capacity_estimate(), 20)
+
+        deferred = Room.objects.only('id', 'area').get(pk=self.room.pk)
+        with self.assertNumQueries(0):
+            self.assertAlmostEqual(deferred.get_area(), 84.0)
+
+    def test_dimensions_follow_queryset_update(self):
+        Room.objects.filter(pk=self.room.pk).update(width=Decimal('5.00'))
+        room = Room.objects.get(pk=self.room.pk)
+        self.assertEqual(room.area, Decimal('40'))
+        self.assertEqual(room.capacity_estimate, 20)
+
+    def test_filter_and_order_by_stored_area(self):
+        Room.objects.create(
+            building=self.building,
+            room_number="С-202",
+            floor=2,
+            location_in_building="Крыло Б",
+            width=Decimal('6.00'),
+            length=Decimal('5.00'),
+            ceiling_height=Decimal('2.80'),
+            purpose="seminar",
+            room_type="auditorium",
+        )
+        numbers = list(
+            Room.objects.filter(area__gt=80).order_by('-volume').values_list('room_number', flat=True)
+        )
+        self.assertEqual(numbers, ["Л-101"])
+
+    def test_moving_or_deleting_room_touches_building(self):
+        other = Building.objects.create(name="Корпус Б", address="Москва", floors_count=5)
+        before = Building.objects.get(pk=self.building.pk).updated_at
+        room = Room.objects.get(pk=self.room.pk)
+        room.building = other
+        room.save()
+        moved = Building.objects.get(pk=self.building.pk).updated_at
+        self.assertGreater(moved, before)
+        room.delete()
+        self.assertGreater(Building.objects.get(pk=other.pk).updated_at, other.updated_at)
+
+
+@override_settings(DATABASES=SQLITE_DB)
+class DepartmentHierarchyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.university = Department.objects.create(name="Университет", department_type="university")
+        cls.faculty = Department.objects.create(
+            name="Факультет", parent=cls.university, department_type="faculty"
+        )
+        cls.chair_b = Department.objects.create(
+            name="Кафедра Б", parent=cls.faculty, department_type="department"
+        )
+        cls.chair_a = Department.objects.create(
+            name="Кафедра А", parent=cls.faculty, department_type="department"
+        )
+        cls.lab = Department.objects.create(
+            name="Лаборатория", parent=cls.chair_b, department_type="laboratory"
+        )
+
+    def test_paths_and_depth(self):
+        lab = Department.objects.get(pk=self.lab.pk)
+        self.assertEqual(
+            lab.path, f"{self.university.pk}/{self.faculty.pk}/{self.chair_b.pk}/{self.lab.pk}/"
+        )
+        self.assertEqual(lab.get_depth(), 3)
+
+    def test_descendants_single_query_in_tree_order(self):
+        with self.assertNumQueries(1):
+            names = [d.name for d in self.university.get_all_descendants()]
+        self.assertEqual(names, ["Факультет", "Кафедра А", "Кафедра Б", "Лаборатория"])
+
+    def test_full_path_single_query(self):
+        lab = Department.objects.get(pk=self.lab.pk)
+        with self.assertNumQueries(1):
+            full_path = lab.get_full_path()
+        self.assertEqual(full_path, "Университет → Факультет → Кафедра Б → Лаборатория")
+
+    def test_reparent_moves_subtree(self):
+        chair_b = Department.objects.get(pk=self.chair_b.pk)
+        chair_b.parent = self.chair_a
+        chair_b.save()
+        lab = Department.objects.get(pk=self.lab.pk)
+        self.assertEqual(lab.get_depth(), 4)
+        self.assertEqual(
+            lab.get_full_path(), "Университет → Факультет → Кафедра А → Кафедра Б → Лаборатория"
+        )
+        self.assertEqual(
+            [d.name for d in self.chair_a.get_all_descendants()], ["Кафедра Б", "Лаборатория"]
+        )
+
+    def test_deep_hierarchy_path_is_not_truncated(self):
+        parent = self.lab
+        for level in range(100):
+            parent = Department.objects.create(
+                name=f"Группа {level}", parent=parent, department_type="center"
+            )
+        deepest = Department.objects.get(pk=parent.pk)
+        self.assertGreater(len(deepest.path), 255)
+        self.assertEqual(deepest.get_depth(), 103)
+        self.assertEqual(deepest.get_ancestor_ids()[:4], [
+            self.university.pk, self.faculty.pk, self.chair_b.pk, self.lab.pk,
+        ])
+        self.assertEqual(len(self.university.get_descendant_ids()), 104)
+
+    def test_rebuild_paths_restores_bulk_created_rows(self):
+        Department.objects.bulk_create([
+            Department(name="Центр", parent=self.faculty, department_type="center"),
+        ])
+        self.assertEqual(Department.rebuild_paths(), 1)
+        center = Department.objects.get(name="Центр")
+        self.assertEqual(center.get_depth(), 2)
+
+
+@skipUnless(connection.vendor == 'postgresql', "EXPLAIN-планы проверяются только в PostgreSQL")
+class RoomListingIndexesTests(TestCase):
+    """
+    Списки помещений читаются по составным индексам в нужном порядке, без Sort.
+    Данные - как у generate_dataset: 20 корпусов по 1000 помещений, планировщик
+    работает без подсказок (enable_seqscan и т.п. не отключаются).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generate_dataset', scale=0.2, rooms_per_building=1000, department_levels=10,
+            stdout=StringIO(),
+        )
+        cls.building = Building.objects.order_by('pk')[1]
+        cls.department = Department.objects.annotate(
+            rooms_count=Count('room')
+        ).order_by('-rooms_count', 'pk').first()
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE auditorium_app_room')
+
+    def explain_listing(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url, params).status_code, 200)
+        listing = [
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "auditorium_app_room"' in query['sql'] and 'ORDER BY' in query['sql']
+        ]
+        self.assertTrue(listing, params)
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {listing[0]}')
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def test_rooms_list_filters_use_index_order(self):
+        filters = {
+            'building': self.building.pk,
+            'purpose': 'laboratory',
+            'room_type': 'laboratory',
+        }
+        url = reverse('auditorium_app:rooms_list')
+        for size in range(len(filters) + 1):
+            for names in combinations(filters, size):
+                params = {name: filters[name] for name in names}
+                plan = self.explain_listing(url, params)
+                self.assertIn('Index Scan', plan, params)
+                self.assertNotIn('Seq Scan on auditorium_app_room', plan, f"{params}:\n{plan}")
+                self.assertNotIn('Sort', plan, f"{params}:\n{plan}")
+
+    def test_deep_cursor_page_seeks_index(self):
+        last = Room.objects.filter(building=self.building).order_by(
+            'floor', 'room_number'
+        ).values_list('building_id', 'floor', 'room_number')[500]
+        url = reverse('auditorium_app:rooms_list')
+        plan = self.explain_listing(url, {'cursor': encode_cursor(list(last), 'next')})
+        # Ключ курсора - нижняя граница составного индекса, а не фильтр по строкам
+        self.assertRegex(plan, r'Index Cond: \(ROW\(building_id, floor, ')
+        self.assertNotIn('Filter', plan)
+        self.assertNotIn('Sort', plan)
+
+    def test_department_rooms_use_partial_index(self):
+        url = reverse('auditorium_app:department_detail', args=[self.department.pk])
+        plan = self.explain_listing(url, {})
+        self.assertIn('room_department_idx', plan)
+        self.assertNotIn('Sort', plan)
@@ -0,0 +1,192 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from auditorium_app import rollups, stats_cache
+from auditorium_app.models import (
+    Building, BuildingRollup, Department, DepartmentRollup, FloorRollup, Room,
+)
+
+
+SQLITE_DB = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+
+@override_settings(DATABASES=SQLITE_DB)
+class RollupDeltaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.building_a = Building.objects.create(name="Корпус А", address="Москва", floors_count=3)
+        cls.building_b = Building.objects.create(name="Корпус Б", address="Москва", floors_count=3)
+        cls.chair = Department.objects.create(name="Кафедра", department_type="department")
+        cls.lab = Department.objects.create(name="Лаборатория", department_type="laboratory")
+
+    def setUp(self):
+        cache.clear()
+
+    def create_room(self, number, **kwargs):
+        values = {
+            'building': self.building_a, 'floor': 1, 'location_in_building': "Крыло А",
+            'width': 5, 'length': 4, 'ceiling_height': 3, 'purpose': "office",
+            'room_type': "office", 'department': self.chair,
+        }
+        values.update(kwargs)
+        return Room.objects.create(room_number=number, **values)
+
+    def totals(self, model, **key):
+        row = model.objects.filter(**key).first()
+        return (row.rooms_count, row.area, row.volume) if row else None
+
+    def test_create_edit_move_and_delete(self):
+        room = self.create_room("101")
+        self.create_room("102", floor=2, room_type="auditorium", purpose="lecture")
+        self.assertEqual(
+            self.totals(BuildingRollup, building=self.building_a, room_type="office"),
+            (1, Decimal('20'), Decimal('60')),
+        )
+        self.assertEqual(self.totals(DepartmentRollup, department=self.chair)[0], 2)
+
+        room = Room.objects.get(pk=room.pk)
+        room.width = 10
+        room.save()
+        self.assertEqual(
+            self.totals(FloorRollup, building=self.building_a, floor_number=1),
+            (1, Decimal('40'), Decimal('120')),
+        )
+
+        # Перенос в другой корпус, на другой этаж и в другое подразделение
+        room.building = self.building_b
+        room.floor = 3
+        room.department = self.lab
+        room.save()
+        self.assertEqual(self.totals(FloorRollup, building=self.building_a, floor_number=1)[0], 0)
+        self.assertEqual(self.totals(FloorRollup, building=self.building_b, floor_number=3)[0], 1)
+        self.assertEqual(self.totals(DepartmentRollup, department=self.chair)[0], 1)
+        self.assertEqual(self.totals(DepartmentRollup, department=self.lab)[0], 1)
+        self.assertEqual(rollups.drift(), [])
+
+        room.delete()
+        self.assertEqual(self.totals(BuildingRollup, building=self.building_b, room_type="office")[0], 0)
+        self.assertEqual(rollups.drift(), [])
+
+    def test_cascades_keep_rollups_consistent(self):
+        self.create_room("101")
+        self.create_room("201", building=self.building_b, department=self.lab)
+        # Подразделение удаляется вместе со своей строкой итогов, помещения остаются без него
+        Department.objects.get(pk=self.chair.pk).delete()
+        self.assertIsNone(self.totals(DepartmentRollup, department=self.chair))
+        Building.objects.get(pk=self.building_b.pk).delete()
+        self.assertFalse(FloorRollup.objects.filter(building=self.building_b).exists())
+        self.assertEqual(rollups.drift(), [])
+
+    def test_building_delete_skips_per_room_deltas(self):
+        self.create_room("101", building=self.building_b, department=self.lab)
+        Room.objects.bulk_create([
+            Room(
+                building=self.building_a, room_number=f"{number}", floor=number % 3 + 1,
+                location_in_building="Крыло А", width=5, length=4, ceiling_height=3,
+                purpose="office", room_type="office",
+                department=(self.chair, self.lab, None)[number % 3],
+            )
+            for number in range(200)
+        ])
+        rollups.rebuild()
+        building = Building.objects.get(pk=self.building_a.pk)
+        # Выборка помещений для сигналов, итоги корпуса и подразделений (в
+        # точке сохранения), каскадное удаление этажей, итогов, помещений
+        # (пакетами) и самого корпуса - без запросов на каждое помещение
+        with self.assertNumQueries(12):
+            building.delete()
+        self.assertFalse(Room.objects.filter(building=self.building_a).exists())
+        self.assertEqual(self.totals(DepartmentRollup, department=self.lab)[0], 1)
+        self.assertEqual(rollups.drift(), [])
+
+    def test_deferred_room_fields(self):
+        room = self.create_room("101")
+        room = Room.objects.only('id', 'room_number').get(pk=room.pk)
+        room.building = self.building_b
+        room.width = 10
+        room.save()
+        self.assertEqual(rollups.drift(), [])
+
+        Room.objects.only('id').get(pk=room.pk).delete()
+        self.assertEqual(rollups.drift(), [])
+
+    def test_statistics_invalidated_after_rollups_change(self):
+        seen = []
+        invalidate = stats_cache.invalidate
+
+        def record(*names):
+            seen.append(self.totals(DepartmentRollup, department=self.chair))
+            invalidate(*names)
+
+        with mock.patch.object(stats_cache, 'invalidate', record):
+            room = self.create_room("101")
+            room.delete()
+        self.assertEqual([totals[0] for totals in seen], [1, 0])
+
+    def test_statistics_views_read_rollups(self):
+        self.create_room("101")
+        # Итоги расходятся с помещениями - представления показывают итоги
+        BuildingRollup.objects.update(rooms_count=7)
+        FloorRollup.objects.update(rooms_count=5)
+        url = reverse('auditorium_app:api_building_statistics', args=[self.building_a.pk])
+        self.assertEqual(self.client.get(url).json()['total_rooms'], 7)
+        resp = self.client.get(reverse('auditorium_app:building_detail', args=[self.building_a.pk]))
+        self.assertEqual(resp.context['total_rooms'], 5)
+
+
+@override_settings(DATABASES=SQLITE_DB)
+class DepartmentSubtreeTotalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.building = Building.objects.create(name="Корпус А", address="Москва", floors_count=3)
+        cls.faculty = Department.objects.create(name="Факультет", department_type="faculty")
+        cls.chair = Department.objects.create(name="Кафедра", department_type="department", parent=cls.faculty)
+        cls.lab = Department.objects.create(name="Лаборатория", department_type="laboratory", parent=cls.chair)
+        cls.center = Department.objects.create(name="Центр", department_type="center", parent=cls.faculty)
+        for number, department in (("101", cls.faculty), ("102", cls.chair), ("103", cls.lab), ("104", cls.lab)):
+            Room.objects.create(
+                building=cls.building, room_number=number, floor=1, location_in_building="Крыло А",
+                width=5, length=4, ceiling_height=3, purpose="office", room_type="office",
+                department=department,
+            )
+
+    def test_totals_in_one_query(self):
+        with self.assertNumQueries(1):
+            totals = rollups.department_subtree_totals(self.faculty.pk)
+        self.assertEqual(totals['name'], "Факультет")
+        self.assertEqual(
+            (totals['own']['departments'], totals['own']['rooms_count'], totals['own']['area']),
+            (1, 1, Decimal('20')),
+        )
+        self.assertEqual(
+            (totals['total']['departments'], totals['total']['rooms_count'], totals['total']['volume']),
+            (4, 4, Decimal('240')),
+        )
+        self.assertEqual(
+            [(child['name'], child['departments'], child['rooms_count']) for child in totals['children']],
+            [("Кафедра", 2, 3), ("Центр", 1, 0)],
+        )
+        self.assertIsNone(rollups.department_subtree_totals(0))
+
+    def test_detail_page_and_api(self):
+        resp = self.client.get(reverse('auditorium_app:department_detail', args=[self.faculty.pk]))
+        self.assertEqual(resp.context['total_rooms'], 1)
+        self.assertEqual(resp.context['subtree']['rooms_count'], 4)
+        chair = next(child for child in resp.context['children'] if child.pk == self.chair.pk)
+        self.assertEqual((chair.rooms_count, chair.subtree['rooms_count']), (1, 3))
+
+        url = reverse('auditorium_app:api_department_statistics', args=[self.chair.pk])
+        data = self.client.get(url).json()
+        self.assertEqual(data['total'], {'departments': 2, 'rooms_count': 3, 'area': 60.0, 'volume': 180.0})
+        self.assertEqual(data['children'][0]['id'], self.lab.pk)
+        missing = reverse('auditorium_app:api_department_statistics', args=[0])
+        self.assertEqual(self.client.get(missing).status_code, 404)
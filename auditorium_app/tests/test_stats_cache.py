@@ -0,0 +1,173 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from auditorium_app import stats_cache
+from auditorium_app.models import Building, Department, Room
+from auditorium_app.views import building_validators
+
+
+SQLITE_DB = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self, value='value', delay=0):
+        def compute():
+            self.calls += 1
+            time.sleep(delay)
+            return value
+        return compute
+
+    def test_hit_after_compute(self):
+        self.assertEqual(stats_cache.get_or_compute('x', self.compute()), 'value')
+        self.assertEqual(stats_cache.get_or_compute('x', self.compute()), 'value')
+        self.assertEqual(self.calls, 1)
+
+    def test_invalidate_marks_only_named_entries(self):
+        stats_cache.get_or_compute('x', self.compute())
+        stats_cache.get_or_compute('y', self.compute())
+        stats_cache.invalidate('x')
+        stats_cache.get_or_compute('x', self.compute())
+        stats_cache.get_or_compute('y', self.compute())
+        self.assertEqual(self.calls, 3)
+
+        stats_cache.invalidate_all()
+        stats_cache.get_or_compute('y', self.compute())
+        self.assertEqual(self.calls, 4)
+
+    def test_stale_value_while_another_request_recomputes(self):
+        stats_cache.get_or_compute('x', self.compute('old'))
+        stats_cache.invalidate('x')
+        cache.add('stats:lock:x', 1)  # пересчет уже идет в другом запросе
+        self.assertEqual(stats_cache.get_or_compute('x', self.compute('new')), 'old')
+        self.assertEqual(self.calls, 1)
+
+    def test_value_of_other_version_is_not_served(self):
+        stats_cache.get_or_compute('x', self.compute('old'), version='etag-1')
+        stats_cache.invalidate('x')
+        self.assertEqual(stats_cache.get_or_compute('x', self.compute('new'), version='etag-2'), 'new')
+        self.assertEqual(stats_cache.get_or_compute('x', self.compute(), version='etag-2'), 'new')
+        self.assertEqual(self.calls, 2)
+
+    def test_concurrent_misses_compute_once(self):
+        results = []
+
+        def worker():
+            results.append(stats_cache.get_or_compute('x', self.compute(delay=0.2)))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 5)
+        self.assertEqual(self.calls, 1)
+
+
+@override_settings(DATABASES=SQLITE_DB)
+class StatisticsInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.building_a = Building.objects.create(name="Корпус А", address="Москва", floors_count=3)
+        cls.building_b = Building.objects.create(name="Корпус Б", address="Москва", floors_count=3)
+        cls.room = Room.objects.create(
+            building=cls.building_a, room_number="101", floor=1, location_in_building="Крыло А",
+            width=5, length=6, ceiling_height=3, purpose="office", room_type="office",
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def statistics_url(self, building):
+        return reverse('auditorium_app:api_building_statistics', args=[building.pk])
+
+    def warm(self):
+        self.client.get(reverse('auditorium_app:index'))
+        self.client.get(self.statistics_url(self.building_a))
+        self.client.get(self.statistics_url(self.building_b))
+
+    def fresh(self, name):
+        cached = stats_cache._read(name)
+        return cached is not None and cached[1]
+
+    def building_fresh(self, building):
+        # Статистика корпуса хранится для версии данных - его текущего ETag
+        etag, _ = building_validators(building.pk)
+        cached = stats_cache._read(stats_cache.building_key(building.pk), etag)
+        return cached is not None and cached[1]
+
+    def test_room_changes_reset_affected_entries(self):
+        self.warm()
+        room = Room.objects.get(pk=self.room.pk)
+        room.description = "Без изменения статистики"
+        room.save()
+        self.assertTrue(self.fresh(stats_cache.GLOBAL))
+
+        room.width = 10
+        room.save()
+        self.assertFalse(self.fresh(stats_cache.GLOBAL))
+        self.assertFalse(self.fresh(stats_cache.BUILDINGS))
+        self.assertFalse(self.building_fresh(self.building_a))
+        self.assertTrue(self.building_fresh(self.building_b))
+        data = self.client.get(self.statistics_url(self.building_a)).json()
+        self.assertEqual(data['total_area'], 60.0)
+
+        self.warm()
+        room.building = self.building_b
+        room.save()
+        self.assertFalse(self.building_fresh(self.building_a))
+        self.assertFalse(self.building_fresh(self.building_b))
+        self.assertEqual(self.client.get(self.statistics_url(self.building_b)).json()['total_rooms'], 1)
+
+    def test_invalidated_again_after_commit(self):
+        self.warm()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            room = Room.objects.get(pk=self.room.pk)
+            room.width = 10
+            room.save()
+            # Пересчет до фиксации транзакции снова делает запись свежей...
+            self.client.get(reverse('auditorium_app:index'))
+            self.assertTrue(self.fresh(stats_cache.GLOBAL))
+        # ...но после фиксации она сбрасывается повторно
+        self.assertTrue(callbacks)
+        self.assertFalse(self.fresh(stats_cache.GLOBAL))
+
+    def test_building_and_department_changes(self):
+        self.warm()
+        Department.objects.create(name="Кафедра", department_type="department")
+        self.assertFalse(self.fresh(stats_cache.GLOBAL))
+        self.assertTrue(self.fresh(stats_cache.BUILDINGS))
+        self.assertTrue(self.building_fresh(self.building_a))
+
+        self.warm()
+        url = self.statistics_url(self.building_b)
+        Building.objects.get(pk=self.building_b.pk).delete()
+        self.assertFalse(self.fresh(stats_cache.GLOBAL))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_counters_endpoint(self):
+        url = reverse('auditorium_app:api_statistics_cache')
+        # Только для персонала: анонимный запрос уходит на вход в админку
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        before = self.client.get(url).json()
+        self.client.get(reverse('auditorium_app:index'))
+        self.client.get(reverse('auditorium_app:buildings_list'))
+        after = self.client.get(url).json()
+        # Главная страница: корпуса и остальная статистика; список корпусов - только корпуса
+        self.assertEqual(after['misses'] - before['misses'], 2)
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertIsNotNone(after['hit_ratio'])
@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Под ASGI (ASYNC_API) JSON API обслуживается async-представлениями
+api_views = async_views if settings.ASYNC_API else views
 
 app_name = 'auditorium_app'
 
@@ -17,6 +21,7 @@ urlpatterns = [
     
     # Помещения
     path('rooms/', views.rooms_list, name='rooms_list'),
+    path('rooms/export/', views.rooms_export, name='rooms_export'),
     path('rooms/<int:room_id>/', views.room_detail, name='room_detail'),
     path('rooms/create/', views.room_create, name='room_create'),
     path('rooms/<int:room_id>/edit/', views.room_edit, name='room_edit'),
@@ -26,7 +31,20 @@ urlpatterns = [
     path('departments/', views.departments_list, name='departments_list'),
     path('departments/<int:department_id>/', views.department_detail, name='department_detail'),
     
+    # Поиск
+    path('search/', views.search, name='search'),
+    
     # API
-    path('api/rooms/<int:room_id>/calculations/', views.api_room_calculations, name='api_room_calculations'),
-    path('api/buildings/<int:building_id>/statistics/', views.api_building_statistics, name='api_building_statistics'),
+    path('api/rooms/', api_views.api_rooms, name='api_rooms'),
+    path('api/buildings/', api_views.api_buildings, name='api_buildings'),
+    path('api/departments/', api_views.api_departments, name='api_departments'),
+    path('api/rooms/calculations/', api_views.api_rooms_calculations, name='api_rooms_calculations'),
+    path('api/rooms/<int:room_id>/calculations/', api_views.api_room_calculations, name='api_room_calculations'),
+    path('api/buildings/statistics/', api_views.api_buildings_statistics, name='api_buildings_statistics'),
+    path('api/buildings/<int:building_id>/statistics/', api_views.api_building_statistics, name='api_building_statistics'),
+    path('api/departments/<int:department_id>/statistics/', api_views.api_department_statistics, name='api_department_statistics'),
+    path('api/search/', api_views.api_search, name='api_search'),
+    path('api/autocomplete/', api_views.api_autocomplete, name='api_autocomplete'),
+    path('api/db/connections/', views.api_db_connections, name='api_db_connections'),
+    path('api/statistics/cache/', views.api_statistics_cache, name='api_statistics_cache'),
 ]
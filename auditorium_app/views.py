@@ -1,181 +1,406 @@
+import csv
+import hashlib
+import json
+from decimal import Decimal
+from functools import wraps
+from itertools import chain
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from django.http import JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.core.paginator import Paginator
-from .models import Building, Department, Room
+from django.db import connections
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Coalesce
+from django.views.decorators.http import condition
+from .models import Building, BuildingRollup, Department, Room
 from .forms import BuildingForm, RoomForm
+from . import stats_cache
+from .db_pool import pool_stats
+from .facets import room_facets
+from .pagination import CursorPaginator
+from .rollups import department_subtree_totals
+from .search import AUTOCOMPLETE_SOURCES, SEARCHES, autocomplete
 
-def index(request):
-    """Главная страница с общей статистикой"""
-    # Общая статистика
-    total_buildings = Building.objects.count()
-    total_rooms = Room.objects.count()
-    total_departments = Department.objects.count()
+# Однозначный порядок помещений: ключ курсорной пагинации
+ROOMS_ORDERING = ('building_id', 'floor', 'room_number')
+BUILDING_ROOMS_ORDERING = ('floor', 'room_number')
+
+
+def _conditional(get_validators):
+    """
+    Условный GET (ETag / Last-Modified) для представления.
+
+    get_validators(**kwargs) возвращает пару (etag, last_modified) одним
+    запросом к БД; результат запоминается на время обработки запроса.
+    """
+    return condition(
+        etag_func=lambda request, **kwargs: request_validators(request, get_validators, **kwargs)[0],
+        last_modified_func=lambda request, **kwargs: request_validators(
+            request, get_validators, **kwargs
+        )[1],
+    )
+
+
+def request_validators(request, get_validators, **kwargs):
+    """Валидаторы (etag, last_modified) текущего запроса, вычисляются один раз"""
+    cache = request.__dict__.setdefault('_validators', {})
+    if get_validators not in cache:
+        cache[get_validators] = get_validators(**kwargs)
+    return cache[get_validators]
+
+
+def _validators_from(key, *timestamps):
+    timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+    etag = hashlib.sha256(repr(key).encode()).hexdigest()
+    return etag, max(timestamps) if timestamps else None
+
+
+def _building_validators_row(queryset, prefix=''):
+    """Агрегаты, меняющиеся при любом изменении корпуса, его помещений и их подразделений"""
+    return queryset.annotate(
+        rooms_count=Count(f'{prefix}rooms'),
+        rooms_updated=Max(f'{prefix}rooms__updated_at'),
+        departments_updated=Max(f'{prefix}rooms__department__updated_at'),
+    ).values(f'{prefix}id', f'{prefix}updated_at', 'rooms_count', 'rooms_updated',
+             'departments_updated').first()
+
+
+def building_validators(building_id):
+    """Валидаторы страницы и статистики корпуса"""
+    row = _building_validators_row(Building.objects.filter(pk=building_id))
+    if row is None:
+        return None, None
+    return _validators_from(
+        ('building', *row.values()),
+        row['updated_at'], row['rooms_updated'], row['departments_updated'],
+    )
+
+
+def room_detail_validators(room_id):
+    """Валидаторы страницы помещения: сам корпус и все его помещения (в т.ч. похожие)"""
+    row = _building_validators_row(Room.objects.filter(pk=room_id), prefix='building__')
+    if row is None:
+        return None, None
+    return _validators_from(
+        ('room', room_id, *row.values()),
+        row['building__updated_at'], row['rooms_updated'], row['departments_updated'],
+    )
+
+
+def room_validators(room_id):
+    """Валидаторы расчетов помещения"""
+    updated_at = Room.objects.filter(pk=room_id).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None, None
+    return _validators_from(('room-calculations', room_id, updated_at), updated_at)
+
+
+def _paginate(request, queryset, ordering, per_page):
+    """Постраничная выборка: курсорная (?cursor=...) или по номеру страницы"""
+    if 'cursor' in request.GET:
+        paginator = CursorPaginator(queryset, ordering, per_page)
+        return paginator.get_page(request.GET.get('cursor')), True
+    paginator = Paginator(queryset.order_by(*ordering), per_page)
+    return paginator.get_page(request.GET.get('page')), False
+
+
+def _buildings_overview():
+    """Корпуса со статистикой и итоги по всем корпусам (кешируется)"""
+    # Все суммы - по таблице итогов BuildingRollup, а не по помещениям
+    totals = BuildingRollup.objects.aggregate(
+        total_rooms=Sum('rooms_count'),
+        total_area=Sum('area'),
+        total_volume=Sum('volume'),
+    )
     
-    # Расчет общих площадей и объемов
-    rooms = Room.objects.all()
-    total_area = sum(room.get_area() for room in rooms)
-    total_volume = sum(room.get_volume() for room in rooms)
-    
-    # Статистика по корпусам
-    buildings_stats = []
-    for building in Building.objects.all():
-        building_rooms = building.rooms.all()
-        building_area = sum(room.get_area() for room in building_rooms)
-        building_volume = sum(room.get_volume() for room in building_rooms)
-        buildings_stats.append({
-            'building': building,
-            'rooms_count': building_rooms.count(),
-            'area': building_area,
-            'volume': building_volume
-        })
+    # Статистика по корпусам (один сгруппированный запрос)
+    buildings = list(Building.objects.annotate(
+        rollup_rooms=Sum('rollups__rooms_count'),
+        rooms_area=Sum('rollups__area'),
+        rooms_volume=Sum('rollups__volume'),
+    ).order_by('name'))
+    for building in buildings:
+        building.rooms_count = building.rollup_rooms or 0
+        building.total_area = float(building.rooms_area or 0)
+        building.total_volume = float(building.rooms_volume or 0)
     
+    return {
+        'total_rooms': totals['total_rooms'] or 0,
+        'total_area': float(totals['total_area'] or 0),
+        'total_volume': float(totals['total_volume'] or 0),
+        'buildings': buildings,
+    }
+
+
+def buildings_overview():
+    return stats_cache.get_or_compute(stats_cache.BUILDINGS, _buildings_overview)
+
+
+def _global_statistics():
+    """Статистика главной страницы сверх buildings_overview() (кешируется)"""
     # Статистика по типам помещений
+    room_type_rows = BuildingRollup.objects.order_by().values('room_type').annotate(
+        count=Sum('rooms_count'),
+        area=Sum('area'),
+    ).filter(count__gt=0)
+    room_type_rows = {row['room_type']: row for row in room_type_rows}
     room_types_stats = {}
-    for room in rooms:
-        room_type = room.get_room_type_display()
-        if room_type not in room_types_stats:
-            room_types_stats[room_type] = {'count': 0, 'area': 0}
-        room_types_stats[room_type]['count'] += 1
-        room_types_stats[room_type]['area'] += room.get_area()
+    for room_type, room_type_display in Room.ROOM_TYPE_CHOICES:
+        row = room_type_rows.get(room_type)
+        if row is not None:
+            room_types_stats[room_type_display] = {
+                'count': row['count'],
+                'area': float(row['area'] or 0),
+            }
     
-    # Расчет оценочной вместимости
-    estimated_capacity = int(total_area / 2)
+    return {
+        'total_departments': Department.objects.count(),
+        'room_types_stats': room_types_stats,
+    }
+
+
+def global_statistics():
+    return stats_cache.get_or_compute(stats_cache.GLOBAL, _global_statistics)
+
+
+def index(request):
+    """Главная страница с общей статистикой"""
+    overview = buildings_overview()
+    statistics = global_statistics()
+    buildings_stats = [
+        {
+            'building': building,
+            'rooms_count': building.rooms_count,
+            'area': building.total_area,
+            'volume': building.total_volume,
+        }
+        for building in overview['buildings']
+    ]
     
     context = {
-        'total_buildings': total_buildings,
-        'total_rooms': total_rooms,
-        'total_departments': total_departments,
-        'total_area': total_area,
-        'total_volume': total_volume,
-        'estimated_capacity': estimated_capacity,
+        'total_buildings': len(buildings_stats),
+        'total_rooms': overview['total_rooms'],
+        'total_departments': statistics['total_departments'],
+        'total_area': overview['total_area'],
+        'total_volume': overview['total_volume'],
+        # Расчет оценочной вместимости
+        'estimated_capacity': int(overview['total_area'] / 2),
         'buildings_stats': buildings_stats,
-        'room_types_stats': room_types_stats,
+        'room_types_stats': statistics['room_types_stats'],
     }
     return render(request, 'auditorium_app/index.html', context)
 
 
 def buildings_list(request):
     """Список всех корпусов"""
-    buildings = Building.objects.all().order_by('name')
-    
-    # Добавляем статистику для каждого корпуса
-    total_rooms_count = 0
-    total_area_sum = 0
-    total_volume_sum = 0
-    
-    for building in buildings:
-        building.rooms_count = building.rooms.count()
-        building.total_area = sum(room.get_area() for room in building.rooms.all())
-        building.total_volume = sum(room.get_volume() for room in building.rooms.all())
-        
-        total_rooms_count += building.rooms_count
-        total_area_sum += building.total_area
-        total_volume_sum += building.total_volume
+    overview = buildings_overview()
     
     context = {
-        'buildings': buildings,
-        'total_rooms_count': total_rooms_count,
-        'total_area_sum': total_area_sum,
-        'total_volume_sum': total_volume_sum,
+        'buildings': overview['buildings'],
+        'total_rooms_count': overview['total_rooms'],
+        'total_area_sum': overview['total_area'],
+        'total_volume_sum': overview['total_volume'],
     }
     return render(request, 'auditorium_app/buildings_list.html', context)
 
 
+@_conditional(building_validators)
 def building_detail(request, building_id):
     """Детальная информация о корпусе"""
     building = get_object_or_404(Building, id=building_id)
     
-    # Получаем все помещения корпуса
-    rooms = building.rooms.all().order_by('floor', 'room_number')
+    # Помещения корпуса (в Python загружается только текущая страница)
+    rooms = building.rooms.select_related('department')
     
-    # Статистика по этажам
+    # Статистика по этажам (таблица итогов FloorRollup)
+    floors_rows = list(building.floor_rollups.filter(rooms_count__gt=0).order_by('floor_number'))
     floors_stats = {}
-    for room in rooms:
-        floor = room.floor
-        if floor not in floors_stats:
-            floors_stats[floor] = {'rooms': 0, 'area': 0, 'volume': 0}
-        floors_stats[floor]['rooms'] += 1
-        floors_stats[floor]['area'] += room.get_area()
-        floors_stats[floor]['volume'] += room.get_volume()
-    
-    # Получаем структуру подразделений в корпусе
+    for row in floors_rows:
+        floors_stats[row.floor_number] = {
+            'rooms': row.rooms_count,
+            'area': float(row.area),
+            'volume': float(row.volume),
+        }
+    
+    # Статистика по подразделениям, имеющим помещения в корпусе
     departments_in_building = Department.objects.filter(
         room__building=building
-    ).distinct().order_by('name')
-    
-    # Статистика по подразделениям
+    ).annotate(
+        rooms_count=Count('room'),
+        rooms_area=Sum('room__area'),
+        rooms_volume=Sum('room__volume'),
+    ).order_by('name')
     departments_stats = []
     for dept in departments_in_building:
-        dept_rooms = rooms.filter(department=dept)
-        dept_area = sum(room.get_area() for room in dept_rooms)
-        dept_volume = sum(room.get_volume() for room in dept_rooms)
         departments_stats.append({
             'department': dept,
-            'rooms_count': dept_rooms.count(),
-            'area': dept_area,
-            'volume': dept_volume
+            'rooms_count': dept.rooms_count,
+            'area': float(dept.rooms_area or 0),
+            'volume': float(dept.rooms_volume or 0)
         })
     
     # Пагинация для помещений
-    paginator = Paginator(rooms, 20)
-    page_number = request.GET.get('page')
-    rooms_page = paginator.get_page(page_number)
+    rooms_page, cursor_mode = _paginate(request, rooms, BUILDING_ROOMS_ORDERING, 20)
     
     context = {
         'building': building,
         'rooms': rooms_page,
+        'cursor_mode': cursor_mode,
         'floors_stats': floors_stats,
         'departments_stats': departments_stats,
-        'total_rooms': rooms.count(),
-        'total_area': sum(room.get_area() for room in rooms),
-        'total_volume': sum(room.get_volume() for room in rooms),
+        'total_rooms': sum(stats['rooms'] for stats in floors_stats.values()),
+        'total_area': float(sum(row.area for row in floors_rows)),
+        'total_volume': float(sum(row.volume for row in floors_rows)),
     }
     return render(request, 'auditorium_app/building_detail.html', context)
 
 
+ROOMS_FILTERS = (
+    ('building', 'building_id'),
+    ('purpose', 'purpose'),
+    ('room_type', 'room_type'),
+)
+
+
+def _filter_rooms(request, rooms):
+    """Применить фильтры списка помещений из GET-параметров"""
+    filters = {}
+    for param, lookup in ROOMS_FILTERS:
+        value = request.GET.get(param)
+        if value:
+            rooms = rooms.filter(**{lookup: value})
+            filters[param] = value
+    return rooms, filters
+
+
 def rooms_list(request):
     """Список всех помещений"""
-    rooms = Room.objects.select_related('building', 'department').all().order_by('building', 'floor', 'room_number')
+    rooms = Room.objects.select_related('building', 'department').all()
     
     # Фильтрация
-    building_filter = request.GET.get('building')
-    purpose_filter = request.GET.get('purpose')
-    room_type_filter = request.GET.get('room_type')
-    
-    if building_filter:
-        rooms = rooms.filter(building_id=building_filter)
-    if purpose_filter:
-        rooms = rooms.filter(purpose=purpose_filter)
-    if room_type_filter:
-        rooms = rooms.filter(room_type=room_type_filter)
+    rooms, filters = _filter_rooms(request, rooms)
     
     # Пагинация
-    paginator = Paginator(rooms, 25)
-    page_number = request.GET.get('page')
-    rooms_page = paginator.get_page(page_number)
+    rooms_page, cursor_mode = _paginate(request, rooms, ROOMS_ORDERING, 25)
     
-    # Данные для фильтров
-    buildings = Building.objects.all().order_by('name')
+    # Данные для фильтров: число помещений для каждого варианта при остальных фильтрах
+    facets = room_facets(filters)
+    buildings = list(Building.objects.all().order_by('name'))
+    for building in buildings:
+        building.facet_count = facets['building'].get(str(building.id), 0)
     
     context = {
         'rooms': rooms_page,
+        'cursor_mode': cursor_mode,
+        'filter_query': urlencode(filters),
         'buildings': buildings,
-        'building_filter': building_filter,
-        'purpose_filter': purpose_filter,
-        'room_type_filter': room_type_filter,
-        'purpose_choices': Room.PURPOSE_CHOICES,
-        'room_type_choices': Room.ROOM_TYPE_CHOICES,
+        'building_filter': request.GET.get('building'),
+        'purpose_filter': request.GET.get('purpose'),
+        'room_type_filter': request.GET.get('room_type'),
+        'purpose_choices': [
+            (value, label, facets['purpose'].get(value, 0)) for value, label in Room.PURPOSE_CHOICES
+        ],
+        'room_type_choices': [
+            (value, label, facets['room_type'].get(value, 0)) for value, label in Room.ROOM_TYPE_CHOICES
+        ],
+        'floor_counts': sorted((int(floor), count) for floor, count in facets['floor'].items()),
     }
     return render(request, 'auditorium_app/rooms_list.html', context)
 
 
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('building', 'building__name'),
+    ('room_number', 'room_number'),
+    ('floor', 'floor'),
+    ('location_in_building', 'location_in_building'),
+    ('width', 'width'),
+    ('length', 'length'),
+    ('ceiling_height', 'ceiling_height'),
+    ('purpose', 'purpose'),
+    ('room_type', 'room_type'),
+    ('department', 'department__name'),
+    ('area', 'area'),
+    ('volume', 'volume'),
+    ('capacity_estimate', 'capacity_estimate'),
+)
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def rooms_export(request):
+    """
+    Потоковая выгрузка отфильтрованного списка помещений (CSV или NDJSON).
+
+    Под ASGI строки отдаются асинхронным итератором (aiterator): синхронный
+    итератор Django 4.2 под ASGI сначала целиком собирает в список. Выборка
+    через values(): aiterator() для values_list() в Django 4.2 выполняет
+    запрос вне потока ORM.
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return JsonResponse({'error': 'Поддерживаются форматы csv и ndjson'}, status=400)
+    try:
+        _api_int(request, 'building')
+    except ApiError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    
+    rooms, filters = _filter_rooms(request, Room.objects.all())
+    headers = [name for name, _ in EXPORT_COLUMNS]
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    rows = rooms.order_by(*ROOMS_ORDERING).values(*lookups)
+    
+    if export_format == 'csv':
+        writer = csv.writer(_Echo())
+        header = [writer.writerow(headers)]
+        
+        def format_row(row):
+            return writer.writerow([row[lookup] for lookup in lookups])
+        content_type = 'text/csv; charset=utf-8'
+    else:
+        header = []
+        
+        def format_row(row):
+            values = {name: row[lookup] for name, lookup in EXPORT_COLUMNS}
+            return json.dumps(values, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+        content_type = 'application/x-ndjson; charset=utf-8'
+    
+    if isinstance(request, ASGIRequest):
+        async def lines():
+            for line in header:
+                yield line
+            async for row in rows.aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+                yield format_row(row)
+        lines = lines()
+    else:
+        lines = chain(header, map(format_row, rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)))
+    
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="rooms.{export_format}"'
+    return response
+
+
+@_conditional(room_detail_validators)
 def room_detail(request, room_id):
     """Детальная информация о помещении"""
-    room = get_object_or_404(Room, id=room_id)
+    room = get_object_or_404(Room.objects.select_related('building', 'department'), id=room_id)
     
     # Похожие помещения в том же корпусе
-    similar_rooms = Room.objects.filter(
+    similar_rooms = Room.objects.select_related('building').filter(
         building=room.building,
         purpose=room.purpose
     ).exclude(id=room_id)[:5]
@@ -187,27 +412,50 @@ def room_detail(request, room_id):
     return render(request, 'auditorium_app/room_detail.html', context)
 
 
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+
+def search(request):
+    """Поиск по помещениям, корпусам и подразделениям"""
+    query = request.GET.get('q', '').strip()
+    results = {}
+    if query:
+        results = {kind: list(find(query, SEARCH_LIMIT)) for kind, find in SEARCHES.items()}
+    
+    context = {
+        'query': query,
+        'rooms': results.get('rooms', []),
+        'buildings': results.get('buildings', []),
+        'departments': results.get('departments', []),
+    }
+    return render(request, 'auditorium_app/search.html', context)
+
+
 def departments_list(request):
     """Список подразделений с иерархией"""
-    # Получаем корневые подразделения (без родителя)
-    root_departments = Department.objects.filter(parent=None).order_by('name')
+    # Все подразделения одним запросом вместе с количеством помещений
+    departments = Department.objects.annotate(rooms_count=Count('room')).order_by('name')
+    
+    children_by_parent = {}
+    for dept in departments:
+        children_by_parent.setdefault(dept.parent_id, []).append(dept)
     
     def get_department_tree(dept, level=0):
         """Рекурсивно строим дерево подразделений"""
-        children = Department.objects.filter(parent=dept).order_by('name')
         result = {
             'department': dept,
             'level': level,
             'children': []
         }
         
-        for child in children:
+        for child in children_by_parent.get(dept.id, []):
             result['children'].append(get_department_tree(child, level + 1))
         
         return result
     
     departments_tree = []
-    for root_dept in root_departments:
+    for root_dept in children_by_parent.get(None, []):
         departments_tree.append(get_department_tree(root_dept))
     
     context = {
@@ -218,25 +466,33 @@ def departments_list(request):
 
 def department_detail(request, department_id):
     """Детальная информация о подразделении"""
-    department = get_object_or_404(Department, id=department_id)
+    department = get_object_or_404(Department.objects.select_related('parent'), id=department_id)
     
     # Помещения подразделения
-    rooms = Room.objects.filter(department=department).order_by('building', 'floor', 'room_number')
+    rooms = Room.objects.filter(department=department).select_related('building').order_by(
+        *ROOMS_ORDERING
+    )
     
-    # Дочерние подразделения
-    children = Department.objects.filter(parent=department).order_by('name')
+    # Итоги самого подразделения, всего поддерева и ветвей дочерних
+    # подразделений - одним рекурсивным запросом по таблице итогов
+    subtree = department_subtree_totals(department.id)
+    branches = {branch['id']: branch for branch in subtree['children']}
     
-    # Статистика
-    total_area = sum(room.get_area() for room in rooms)
-    total_volume = sum(room.get_volume() for room in rooms)
+    # Дочерние подразделения с числом собственных помещений и итогами ветви
+    children = list(Department.objects.filter(parent=department).annotate(
+        rooms_count=Coalesce('rollup__rooms_count', 0)
+    ).order_by('name'))
+    for child in children:
+        child.subtree = branches.get(child.id)
     
     context = {
         'department': department,
         'rooms': rooms,
         'children': children,
-        'total_rooms': rooms.count(),
-        'total_area': total_area,
-        'total_volume': total_volume,
+        'total_rooms': subtree['own']['rooms_count'],
+        'total_area': float(subtree['own']['area']),
+        'total_volume': float(subtree['own']['volume']),
+        'subtree': subtree['total'],
     }
     return render(request, 'auditorium_app/department_detail.html', context)
 
@@ -248,7 +504,7 @@ def building_faculties(request, building_id):
     # Получаем все подразделения, которые имеют помещения в этом корпусе
     departments_in_building = Department.objects.filter(
         room__building=building
-    ).distinct()
+    ).select_related('parent').distinct()
     
     # Строим иерархию
     def build_hierarchy(departments):
@@ -397,6 +653,7 @@ def room_delete(request, room_id):
 
 
 # API для AJAX запросов
+@_conditional(room_validators)
 def api_room_calculations(request, room_id):
     """API для получения расчетов помещения"""
     room = get_object_or_404(Room, id=room_id)
@@ -410,28 +667,472 @@ def api_room_calculations(request, room_id):
     return JsonResponse(data)
 
 
+def _buildings_statistics_rows(building_ids=None):
+    """Итоги корпусов по видам помещений (BuildingRollup) для buildings_statistics"""
+    buildings = Building.objects.all()
+    if building_ids is not None:
+        buildings = buildings.filter(id__in=building_ids)
+    return buildings.values(
+        'id',
+        room_type=F('rollups__room_type'),
+        rooms_count=F('rollups__rooms_count'),
+        rooms_area=F('rollups__area'),
+        rooms_volume=F('rollups__volume'),
+    ).order_by('id')
+
+
+def _fold_buildings_statistics(rows):
+    room_type_order = {value: index for index, (value, _) in enumerate(Room.ROOM_TYPE_CHOICES)}
+    room_type_display = dict(Room.ROOM_TYPE_CHOICES)
+    statistics = {}
+    for row in sorted(rows, key=lambda row: (row['id'], room_type_order.get(row['room_type'], -1))):
+        data = statistics.setdefault(row['id'], {
+            'total_rooms': 0,
+            'total_area': 0.0,
+            'total_volume': 0.0,
+            'room_types': {},
+        })
+        if not row['rooms_count']:
+            continue
+        area = float(row['rooms_area'] or 0)
+        data['total_rooms'] += row['rooms_count']
+        data['total_area'] += area
+        data['total_volume'] += float(row['rooms_volume'] or 0)
+        room_type = row['room_type']
+        data['room_types'][room_type_display.get(room_type, room_type)] = {
+            'count': row['rooms_count'],
+            'area': area,
+        }
+    return statistics
+
+
+def buildings_statistics(building_ids=None):
+    """
+    Статистика корпусов (как в api_building_statistics) одним сгруппированным запросом.
+
+    Возвращает словарь {id корпуса: статистика}; building_ids=None - все корпуса.
+    """
+    return _fold_buildings_statistics(_buildings_statistics_rows(building_ids))
+
+
+def _buildings_statistics_data(statistics, building_ids):
+    if building_ids is not None:
+        missing = [building_id for building_id in building_ids if building_id not in statistics]
+        if missing:
+            raise ApiNotFound("Корпуса не найдены", missing_ids=missing)
+    return {'results': [{'id': building_id, **data} for building_id, data in statistics.items()]}
+
+
+def building_statistics(building_id, etag=None):
+    """
+    Статистика одного корпуса (кешируется); None - корпуса нет.
+    С etag кешированное значение отдается, только если вычислено для этого ETag.
+    """
+    return stats_cache.get_or_compute(
+        stats_cache.building_key(building_id),
+        lambda: buildings_statistics([building_id]).get(building_id),
+        version=etag,
+    )
+
+
+@_conditional(building_validators)
 def api_building_statistics(request, building_id):
     """API для получения статистики корпуса"""
-    building = get_object_or_404(Building, id=building_id)
+    etag, _ = request_validators(request, building_validators, building_id=building_id)
+    statistics = building_statistics(building_id, etag)
+    if statistics is None:
+        raise Http404("Корпус не найден")
     
-    rooms = building.rooms.all()
-    total_area = sum(room.get_area() for room in rooms)
-    total_volume = sum(room.get_volume() for room in rooms)
+    return JsonResponse(statistics)
+
+
+def _subtree_totals_data(totals):
+    return {**totals, 'area': float(totals['area']), 'volume': float(totals['volume'])}
+
+
+def _department_statistics_data(statistics):
+    if statistics is None:
+        raise Http404("Подразделение не найдено")
+    return {
+        'id': statistics['id'],
+        'name': statistics['name'],
+        'own': _subtree_totals_data(statistics['own']),
+        'total': _subtree_totals_data(statistics['total']),
+        'children': [_subtree_totals_data(child) for child in statistics['children']],
+    }
+
+
+def api_department_statistics(request, department_id):
+    """API: статистика подразделения с учетом подчиненных и по дочерним подразделениям"""
+    return JsonResponse(_department_statistics_data(department_subtree_totals(department_id)))
+
+
+def api_buildings_statistics(request):
+    """API: статистика нескольких корпусов (?ids=1,2,3, по умолчанию - все) одним запросом"""
+    def build():
+        building_ids = _api_ids(request)
+        return _buildings_statistics_data(buildings_statistics(building_ids), building_ids)
+    return _api_response(build)
+
+
+# JSON API списков (чтение через values(), курсорная пагинация)
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 500
+
+ROOM_API_FIELDS = {
+    'id': 'id',
+    'building_id': 'building_id',
+    'building': 'building__name',
+    'room_number': 'room_number',
+    'floor': 'floor',
+    'location_in_building': 'location_in_building',
+    'width': 'width',
+    'length': 'length',
+    'ceiling_height': 'ceiling_height',
+    'purpose': 'purpose',
+    'room_type': 'room_type',
+    'department_id': 'department_id',
+    'department': 'department__name',
+    'description': 'description',
+    'area': 'area',
+    'volume': 'volume',
+    'capacity_estimate': 'capacity_estimate',
+    'updated_at': 'updated_at',
+}
+
+BUILDING_API_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'address': 'address',
+    'floors_count': 'floors_count',
+    'description': 'description',
+    'updated_at': 'updated_at',
+}
+
+DEPARTMENT_API_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'department_type': 'department_type',
+    'parent_id': 'parent_id',
+    'depth': 'depth',
+    'description': 'description',
+}
+
+def _finite_decimal(value):
+    """Decimal из строки; NaN и бесконечность - ошибка (их не принимает поле модели)"""
+    value = Decimal(value)
+    if not value.is_finite():
+        raise ValueError(value)
+    return value
+
+
+ROOM_API_RANGE_FILTERS = (
+    ('floor_min', 'floor__gte', int),
+    ('floor_max', 'floor__lte', int),
+    ('area_min', 'area__gte', _finite_decimal),
+    ('area_max', 'area__lte', _finite_decimal),
+)
+
+
+class ApiError(Exception):
+    """Ошибка параметров запроса к JSON API (ответ 400)"""
+    status = 400
+
+    def __init__(self, message, **details):
+        super().__init__(message)
+        self.details = details
+
+
+class ApiNotFound(ApiError):
+    """Запрошенные объекты не найдены (ответ 404)"""
+    status = 404
+
+
+def _api_int(request, param, default=None):
+    value = request.GET.get(param)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f"Параметр '{param}' должен быть целым числом")
+
+
+def _api_ids(request, param='ids'):
+    """Список id без повторов из параметра вида 1,2,3; None - если параметр не задан"""
+    if not request.GET.get(param):
+        return None
+    try:
+        return list(dict.fromkeys(int(value) for value in request.GET[param].split(',')))
+    except ValueError:
+        raise ApiError(f"Параметр '{param}' должен быть списком целых чисел через запятую")
+
+
+def _api_list_paginator(request, queryset, api_fields, ordering):
+    """Пагинатор списка с выбором полей (?fields=) и размером страницы (?limit=)"""
+    fields = list(api_fields)
+    if request.GET.get('fields'):
+        fields = [field.strip() for field in request.GET['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in api_fields]
+        if unknown:
+            raise ApiError(f"Неизвестные поля: {', '.join(unknown)}")
+    limit = _api_int(request, 'limit', API_PAGE_SIZE)
+    if not 1 <= limit <= API_MAX_PAGE_SIZE:
+        raise ApiError(f"Параметр 'limit' должен быть от 1 до {API_MAX_PAGE_SIZE}")
     
-    # Статистика по типам помещений
-    room_types = {}
-    for room in rooms:
-        room_type = room.get_room_type_display()
-        if room_type not in room_types:
-            room_types[room_type] = {'count': 0, 'area': 0}
-        room_types[room_type]['count'] += 1
-        room_types[room_type]['area'] += room.get_area()
+    lookups = {api_fields[field] for field in fields} | set(ordering)
+    paginator = CursorPaginator(queryset.values(*lookups), ordering, limit)
+    return paginator, [(field, api_fields[field]) for field in fields]
+
+
+def _api_list_data(page, fields):
+    results = []
+    for row in page:
+        item = {}
+        for field, lookup in fields:
+            value = row[lookup]
+            item[field] = float(value) if isinstance(value, Decimal) else value
+        results.append(item)
     
-    data = {
-        'total_rooms': rooms.count(),
-        'total_area': total_area,
-        'total_volume': total_volume,
-        'room_types': room_types,
+    return {
+        'results': results,
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
     }
+
+
+def _api_list(request, queryset, api_fields, ordering):
+    """Страница списка с выбором полей (?fields=) и курсором (?cursor=)"""
+    paginator, fields = _api_list_paginator(request, queryset, api_fields, ordering)
+    data = _api_list_data(paginator.get_page(request.GET.get('cursor')), fields)
+    if request.GET.get('count'):
+        data['count'] = paginator.count
+    return data
+
+
+def _api_response(build):
+    try:
+        return JsonResponse(build())
+    except ApiError as exc:
+        return JsonResponse({'error': str(exc), **exc.details}, status=exc.status)
+
+
+def _api_rooms_queryset(request):
+    rooms = Room.objects.all()
+    if request.GET.get('building'):
+        _api_int(request, 'building')
+    rooms, _ = _filter_rooms(request, rooms)
+    for param, lookup, convert in ROOM_API_RANGE_FILTERS:
+        value = request.GET.get(param)
+        if value:
+            try:
+                rooms = rooms.filter(**{lookup: convert(value)})
+            except (ValueError, ArithmeticError):
+                raise ApiError(f"Параметр '{param}' должен быть числом")
+    return rooms
+
+
+def _api_departments_queryset(request):
+    departments = Department.objects.all()
+    if request.GET.get('parent'):
+        departments = departments.filter(parent_id=_api_int(request, 'parent'))
+    if request.GET.get('department_type'):
+        departments = departments.filter(department_type=request.GET['department_type'])
+    return departments
+
+
+def api_rooms(request):
+    """API: список помещений с фильтрами и выбором полей"""
+    return _api_response(
+        lambda: _api_list(request, _api_rooms_queryset(request), ROOM_API_FIELDS, ROOMS_ORDERING)
+    )
+
+
+def api_buildings(request):
+    """API: список корпусов с выбором полей"""
+    return _api_response(
+        lambda: _api_list(request, Building.objects.all(), BUILDING_API_FIELDS, ('name', 'id'))
+    )
+
+
+def api_departments(request):
+    """API: список подразделений с фильтрами по родителю и типу"""
+    return _api_response(lambda: _api_list(
+        request, _api_departments_queryset(request), DEPARTMENT_API_FIELDS, ('name', 'id')
+    ))
+
+
+ROOM_CALCULATIONS_BATCH_LIMIT = 500
+
+
+def _room_calculations(row):
+    return {
+        'id': row['id'],
+        'area': float(row['area']),
+        'volume': float(row['volume']),
+        'capacity_estimate': row['capacity_estimate'],
+    }
+
+
+def _rooms_calculations_queryset(request):
+    """
+    Выборка для пакетного расчета и список запрошенных id (None - выборка по корпусу).
+
+    Выборка по корпусу ограничена ROOM_CALCULATIONS_BATCH_LIMIT + 1 строками,
+    чтобы превышение лимита проверялось без отдельного COUNT.
+    """
+    fields = ('id', 'area', 'volume', 'capacity_estimate')
+    limit = ROOM_CALCULATIONS_BATCH_LIMIT
+    ids = _api_ids(request)
+    if ids is not None:
+        if len(ids) > limit:
+            raise ApiError(f"Можно запросить не более {limit} помещений")
+        return Room.objects.filter(id__in=ids).values(*fields), ids
     
-    return JsonResponse(data)
\ No newline at end of file
+    building_id = _api_int(request, 'building')
+    if building_id is None:
+        raise ApiError("Укажите 'ids' или 'building' (и, при необходимости, 'floor')")
+    rooms = Room.objects.filter(building_id=building_id)
+    floor = _api_int(request, 'floor')
+    if floor is not None:
+        rooms = rooms.filter(floor=floor)
+    return rooms.order_by(*ROOMS_ORDERING).values(*fields)[:limit + 1], None
+
+
+def _rooms_calculations_data(rows, ids):
+    if ids is not None:
+        rows = {row['id']: row for row in rows}
+        missing = [room_id for room_id in ids if room_id not in rows]
+        if missing:
+            raise ApiNotFound("Помещения не найдены", missing_ids=missing)
+        return {'results': [_room_calculations(rows[room_id]) for room_id in ids]}
+    if len(rows) > ROOM_CALCULATIONS_BATCH_LIMIT:
+        raise ApiError(
+            f"Выборка превышает {ROOM_CALCULATIONS_BATCH_LIMIT} помещений, уточните этаж или список ids"
+        )
+    return {'results': [_room_calculations(row) for row in rows]}
+
+
+def api_rooms_calculations(request):
+    """API: расчеты для набора помещений (?ids=1,2,3 или ?building=&floor=) одним запросом"""
+    def build():
+        rooms, ids = _rooms_calculations_queryset(request)
+        return _rooms_calculations_data(list(rooms), ids)
+    return _api_response(build)
+
+
+def _api_kinds(request, allowed):
+    """Типы объектов из ?type=a,b (по умолчанию все допустимые)"""
+    if not request.GET.get('type'):
+        return list(allowed)
+    kinds = [kind.strip() for kind in request.GET['type'].split(',') if kind.strip()]
+    unknown = [kind for kind in kinds if kind not in allowed]
+    if unknown:
+        raise ApiError(f"Неизвестные типы: {', '.join(unknown)}")
+    return kinds
+
+
+SEARCH_API_FIELDS = {
+    'rooms': lambda room: {
+        'id': room.id,
+        'room_number': room.room_number,
+        'building_id': room.building_id,
+        'building': room.building.name,
+        'floor': room.floor,
+        'purpose': room.purpose,
+        'room_type': room.room_type,
+    },
+    'buildings': lambda building: {
+        'id': building.id,
+        'name': building.name,
+        'address': building.address,
+    },
+    'departments': lambda department: {
+        'id': department.id,
+        'name': department.name,
+        'department_type': department.department_type,
+    },
+}
+
+
+def _search_params(request):
+    """Строка поиска, число результатов и типы объектов из параметров запроса"""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        raise ApiError("Укажите строку поиска 'q'")
+    limit = _api_int(request, 'limit', SEARCH_LIMIT)
+    if not 1 <= limit <= SEARCH_MAX_LIMIT:
+        raise ApiError(f"Параметр 'limit' должен быть от 1 до {SEARCH_MAX_LIMIT}")
+    return query, limit, _api_kinds(request, SEARCHES)
+
+
+def _search_result(kind, obj):
+    return {**SEARCH_API_FIELDS[kind](obj), 'rank': float(obj.rank)}
+
+
+def api_search(request):
+    """API: полнотекстовый поиск (?q=, ?type=rooms,buildings,departments, ?limit=)"""
+    def build():
+        query, limit, kinds = _search_params(request)
+        data = {'query': query}
+        for kind in kinds:
+            data[kind] = [_search_result(kind, obj) for obj in SEARCHES[kind](query, limit)]
+        return data
+    return _api_response(build)
+
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+
+def _autocomplete_params(request):
+    """Строка, число подсказок и типы объектов из параметров запроса"""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        raise ApiError("Укажите строку 'q'")
+    limit = _api_int(request, 'limit', AUTOCOMPLETE_LIMIT)
+    if not 1 <= limit <= AUTOCOMPLETE_MAX_LIMIT:
+        raise ApiError(f"Параметр 'limit' должен быть от 1 до {AUTOCOMPLETE_MAX_LIMIT}")
+    return query, limit, tuple(_api_kinds(request, AUTOCOMPLETE_SOURCES))
+
+
+def api_autocomplete(request):
+    """API: автодополнение номеров помещений и названий (?q=, ?type=, ?limit=)"""
+    def build():
+        query, limit, kinds = _autocomplete_params(request)
+        return {'query': query, 'results': autocomplete(query, limit, kinds)}
+    return _api_response(build)
+
+
+def _diagnostics(view):
+    """
+    Служебные API раскрывают устройство пулов и кешей: доступны персоналу
+    (is_staff) или, при DIAGNOSTICS_API, всем (разработка, benchmark_views)
+    """
+    staff_view = staff_member_required(view)
+
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        if settings.DIAGNOSTICS_API:
+            return view(request, *args, **kwargs)
+        return staff_view(request, *args, **kwargs)
+    return inner
+
+
+@_diagnostics
+def api_db_connections(request):
+    """API: настройки соединений с БД и статистика пулов соединений процесса"""
+    databases = {
+        alias: {
+            'conn_max_age': connections[alias].settings_dict['CONN_MAX_AGE'],
+            'health_checks': connections[alias].settings_dict['CONN_HEALTH_CHECKS'],
+        }
+        for alias in connections
+    }
+    return JsonResponse({'databases': databases, 'pools': pool_stats()})
+
+
+@_diagnostics
+def api_statistics_cache(request):
+    """API: счетчики кеша статистики процесса (попадания, промахи, пересчеты)"""
+    return JsonResponse(stats_cache.cache_stats())
@@ -40,10 +40,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'auditorium_app',
 ]
 
 MIDDLEWARE = [
+    'auditorium_app.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,19 +74,39 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'university_auditorium.wsgi.application'
+ASGI_APPLICATION = 'university_auditorium.asgi.application'
+
+# Маршруты api/ обслуживаются async-представлениями (auditorium_app.async_views);
+# включается для запуска под ASGI-сервером (uvicorn)
+ASYNC_API = env('ASYNC_API', '') in ('1', 'true', 'yes')
 
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Постоянные соединения: DB_CONN_MAX_AGE секунд (0 - новое соединение на каждый
+# запрос) с проверкой перед повторным использованием (DB_CONN_HEALTH_CHECKS).
+# DB_POOL_SIZE > 0 включает пул соединений процесса (auditorium_app.db_pool),
+# общий для всех потоков; соединения при этом возвращаются в пул после запроса.
+DB_POOL_SIZE = int(env('DB_POOL_SIZE', 0))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'auditorium_app.db_pool' if DB_POOL_SIZE else 'django.db.backends.postgresql',
         'NAME': env('POSTGRES_DB'),
         'USER': env('POSTGRES_USER'),
         'PASSWORD': env('POSTGRES_PASSWORD'),
         'HOST': env('POSTGRES_HOST'),
-        'PORT': 5432
+        'PORT': 5432,
+        'CONN_MAX_AGE': 0 if DB_POOL_SIZE else int(env('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': env('DB_CONN_HEALTH_CHECKS', '1') in ('1', 'true', 'yes'),
+        'OPTIONS': {
+            'pool': {
+                'size': DB_POOL_SIZE,
+                'timeout': float(env('DB_POOL_TIMEOUT', 10)),
+                'max_idle': float(env('DB_POOL_MAX_IDLE', 300)),
+            },
+        } if DB_POOL_SIZE else {},
     }
 }
 
@@ -134,3 +156,81 @@ STATICFILES_DIRS = [
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Кеш (статистика, счетчики фильтров). С REDIS_URL - общий
+# для всех процессов Redis: сброс статистики из сигналов и команд управления виден
+# всем рабочим процессам. Без него - кеш процесса в памяти, пригодный только для
+# одного процесса (runserver, тесты).
+if env('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': env('REDIS_URL'),
+            'KEY_PREFIX': 'auditorium_app',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'auditorium_app',
+            'OPTIONS': {'MAX_ENTRIES': int(env('CACHE_MAX_ENTRIES', 10000))},
+        }
+    }
+
+# Ответы автодополнения - всегда в памяти процесса, и при общем Redis: частые
+# префиксы отдаются без сетевого обращения, а устаревание ответа ограничено
+# AUTOCOMPLETE_CACHE_TIMEOUT
+CACHES['autocomplete'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'auditorium_app_autocomplete',
+    'OPTIONS': {'MAX_ENTRIES': int(env('AUTOCOMPLETE_CACHE_MAX_ENTRIES', 10000))},
+}
+
+# Время жизни закешированного ответа автодополнения, с
+AUTOCOMPLETE_CACHE_TIMEOUT = int(env('AUTOCOMPLETE_CACHE_TIMEOUT', 60))
+
+# Время жизни счетчиков фильтров списка помещений (для каждого сочетания фильтров), с
+ROOMS_FACETS_CACHE_TIMEOUT = int(env('ROOMS_FACETS_CACHE_TIMEOUT', 30))
+
+# Кеш статистики (auditorium_app.stats_cache): время жизни свежей записи, сколько
+# хранится устаревшая (отдается, пока другой запрос пересчитывает) и предельное
+# время пересчета, с
+STATS_CACHE_TIMEOUT = int(env('STATS_CACHE_TIMEOUT', 300))
+STATS_CACHE_STALE_TIMEOUT = int(env('STATS_CACHE_STALE_TIMEOUT', 3600))
+STATS_CACHE_LOCK_TIMEOUT = int(env('STATS_CACHE_LOCK_TIMEOUT', 10))
+
+
+# Служебные API (/api/db/connections/, /api/statistics/cache/) без входа в админку,
+# иначе - только для персонала (is_staff); включать лишь для разработки и замеров
+DIAGNOSTICS_API = env('DIAGNOSTICS_API', '') in ('1', 'true', 'yes')
+
+
+# Профилирование запросов (auditorium_app.middleware): заголовок Server-Timing
+# и строка лога с числом/временем SQL-запросов на каждый запрос
+PROFILING_ENABLED = env('PROFILING_ENABLED', '1') in ('1', 'true', 'yes')
+PROFILING_DUPLICATE_QUERY_THRESHOLD = int(env('PROFILING_DUPLICATE_QUERY_THRESHOLD', 5))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'profiling': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'profiling': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'profiling',
+        },
+    },
+    'loggers': {
+        'auditorium_app.profiling': {
+            'handlers': ['profiling'],
+            'level': env('PROFILING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
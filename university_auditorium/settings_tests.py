@@ -9,3 +9,6 @@ DATABASES = {
 }
 
 
+
+# В тестах лог профилирования - только предупреждения о повторах запросов
+LOGGING['loggers']['auditorium_app.profiling']['level'] = 'WARNING'  # noqa: F405